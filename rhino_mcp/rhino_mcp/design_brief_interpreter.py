@@ -6,504 +6,319 @@ that can be executed in Rhino and Grasshopper.
 """
 
 import re
+import atexit
 import logging
-from typing import Dict, List, Any, Tuple, Optional, Union
+import multiprocessing
+from typing import Dict, List, Any, Tuple, Optional, Union, Sequence
+import io
+import textwrap
 import json
+import hashlib
+from collections import ChainMap, OrderedDict
+from types import MappingProxyType
+from functools import cached_property, partial
+
+from mcp.server.fastmcp import Context
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger("DesignBriefInterpreter")
 
-class DesignBriefInterpreter:
+# Maximum number of generated Rhino scripts kept per interpreter
+_RHINO_CODE_CACHE_SIZE = 256
+
+# Maximum number of serialized brief responses kept per interpreter
+_BRIEF_CACHE_SIZE = 256
+
+# Briefs handed to each batch worker per dispatch
+_BATCH_CHUNK_SIZE = 4
+
+# Batch size from which briefs are spread over the worker pool; a brief takes
+# about a millisecond, so smaller batches are interpreted in the server process
+_BATCH_POOL_THRESHOLD = 256
+
+# Code targets generated when the caller does not ask for specific ones
+_DEFAULT_CODE_TARGETS = ("rhino",)
+
+# Estimated element count (facade panels, urban blocks, structural grid cells) from which
+# the emitted script uses the NumPy/Numba paths; below it their import and JIT compile
+# time outweighs the work
+_VECTORIZE_THRESHOLD = 512
+
+# Building width used by the facade envelope template
+_FACADE_WIDTH = 20.0
+
+
+def _merged_params(operations: List[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None) -> ChainMap:
     """
-    Interprets natural language design briefs and converts them into 
-    structured parametric operations for Rhino and Grasshopper.
+    View of all operation params with the domain defaults as the last layer; later
+    operations take precedence over earlier ones and defaults.
+    
+    Values derived by a generator go into a child map (ChainMap.new_child), so the
+    operations themselves are never written to.
+    """
+    maps = [op.get("params", {}) for op in reversed(operations)]
+    if defaults is not None:
+        maps.append(defaults)
+    return ChainMap(*maps)
+
+
+# Defaults for every placeholder used by the facade templates
+_FACADE_DEFAULTS = {
+    "story_count": 5,
+    "floor_height": 3.0,
+    "grid_size": 1.0,
+    "panel_density": 0.8,
+    "facade_offset": 0.5,
+    "panel_depth": 0.2,
+    "responsive_panels": True,
+    "sun_priority": 0.8,
+    "view_priority": 0.7,
+    "panel_rotation_limit": 45,
+    "material": "glass",
+}
+
+# Defaults for every parameter read by the floor plan generator
+_FLOOR_PLAN_DEFAULTS = {
+    "width": 15.0,
+    "depth": 12.0,
+    "room_count": 4,
+    "has_balcony": True,
+    "has_bathroom": True,
+    "has_kitchen": True,
+    "open_plan": False,
+    "unit_type": "apartment",
+}
+
+# Defaults for every parameter read by the urban generator
+_URBAN_DEFAULTS = {
+    "grid_size": 100.0,
+    "grid_rows": 5,
+    "grid_columns": 5,
+    "road_width": 20.0,
+    "site_boundary": 600.0,
+    "max_building_height": 100.0,
+    "min_building_height": 10.0,
+    "building_density": 0.7,
+    "building_setback": 5.0,
+    "height_distribution": 0.8,
+    "include_green_areas": True,
+}
+
+# Defaults for every parameter read by the structure generator
+_STRUCTURE_DEFAULTS = {
+    "grid_size": 6.0,
+    "system_type": "column_beam",
+    "dimensions": [0.4, 0.4],
+    "beam_depth": 0.5,
+    "material": "concrete",
+    "num_floors": 3,
+    "grid_x": 5,
+    "grid_y": 4,
+    "floor_height": 3.5,
+    "thickness": 0.2,
+}
+
+# Facade panel colors (RGBA) by material, resolved when the code is generated
+_FACADE_MATERIAL_COLORS = {
+    "glass": [150, 210, 255, 100],
+    "metal": [180, 180, 190, 255],
+    "wood": [185, 122, 87, 255],
+    "aluminum": [200, 200, 210, 255],
+    "concrete": [180, 180, 170, 255],
+    "solid": [120, 120, 120, 255],
+}
+
+
+# Apartment layout dimensions (meters) and room size factors, shared by the emitted
+# apartment script and _apartment_door_centers so both place the rooms identically
+_APARTMENT_LAYOUT = MappingProxyType({
+    "wall_thickness": 0.2,
+    "hall_width": 1.2,
+    "service_depth": 5,  # Depth reserved for kitchen, bathroom and hallway
+    "living_width_factor": 1.5,
+    "living_depth_factor": 1.3,
+    "master_width_factor": 1.2,
+    "master_depth_factor": 1.2,
+    "bed2_width_factor": 0.9,
+    "study_size_factor": 0.8,
+    "kitchen_width": 3.5,
+    "kitchen_depth": 3.0,
+    "bath_width": 2.5,
+    "bath_depth": 2.0,
+    "bath2_width": 2.0,
+    "bath2_depth": 2.0,
+})
+
+
+def _apartment_door_centers(width: float, depth: float, room_count: int,
+                            has_kitchen: bool, has_bathroom: bool) -> Dict[str, List[float]]:
     """
+    Door center for every room of the apartment layout, keyed by room name.
     
-    def __init__(self):
-        # Design parameters and their default values
-        self.default_params = {
-            "grid_size": 1.0,            # Base grid size in meters
-            "floor_height": 3.0,          # Default floor height in meters
-            "panel_depth": 0.2,           # Default panel depth in meters
-            "facade_offset": 0.5,         # Offset from building envelope in meters
-            "story_count": 5,             # Default number of stories
-            "responsive_panels": True,    # Whether panels respond to environment
-            "panel_density": 0.8,         # Density of panels (0.0-1.0)
-            "view_priority": 0.7,         # Priority for views (0.0-1.0)
-            "sun_priority": 0.8,          # Priority for sun angle response (0.0-1.0)
-            "panel_rotation_limit": 45,   # Maximum panel rotation in degrees
-            "panel_type": "rectangular",  # Default panel geometry
-            "material": "glass",          # Default material
-            "structural_system": "frame", # Default structural system
-        }
-        
-        # Common design brief keywords and their parameter mappings
-        self.keyword_mappings = {
-            # Building scale and form
-            "high-rise": {"story_count": 30, "panel_density": 0.9},
-            "mid-rise": {"story_count": 15, "panel_density": 0.8},
-            "low-rise": {"story_count": 5, "panel_density": 0.7},
-            "tower": {"story_count": 40, "panel_density": 0.85, "form": "tower"},
-            
-            # Panel types and systems
-            "dynamic": {"responsive_panels": True, "panel_rotation_limit": 60},
-            "static": {"responsive_panels": False, "panel_rotation_limit": 0},
-            "kinetic": {"responsive_panels": True, "panel_rotation_limit": 90},
-            "adaptive": {"responsive_panels": True, "panel_rotation_limit": 75},
-            "responsive": {"responsive_panels": True},
-            "louvres": {"panel_type": "louvre", "panel_density": 0.9},
-            "sunshade": {"panel_type": "louvre", "sun_priority": 0.9, "view_priority": 0.5},
-            
-            # Environmental responses
-            "sun angle": {"sun_priority": 0.9},
-            "solar": {"sun_priority": 0.9},
-            "daylight": {"sun_priority": 0.8, "panel_type": "perforated"},
-            "shadowing": {"sun_priority": 0.9, "panel_density": 0.9},
-            
-            # View and aesthetic elements
-            "views": {"view_priority": 0.9},
-            "framing views": {"view_priority": 0.95, "panel_density": 0.7},
-            "transparent": {"material": "glass", "panel_density": 0.6},
-            "opaque": {"material": "solid", "panel_density": 0.9},
-            
-            # Materials
-            "glass": {"material": "glass"},
-            "metal": {"material": "metal"},
-            "wood": {"material": "wood"},
-            "aluminum": {"material": "aluminum"},
-            "concrete": {"material": "concrete"},
-            
-            # Patterns and density
-            "dense": {"panel_density": 0.9},
-            "sparse": {"panel_density": 0.5},
-            "porous": {"panel_density": 0.6, "panel_type": "perforated"},
-            "pattern": {"panel_type": "patterned"},
-            "parametric": {"panel_type": "parametric"},
-            
-            # Structural considerations
-            "lightweight": {"structural_system": "lightweight"},
-            "modular": {"grid_size": 1.2, "structural_system": "modular"},
-            "prefab": {"structural_system": "modular"},
-        }
-        
-        # Brief analysis regex patterns
-        self.patterns = {
-            "building_type": r"(high-rise|mid-rise|low-rise|tower|building)",
-            "facade_type": r"(dynamic|kinetic|adaptive|responsive|static|louvres|sunshade)",
-            "environment": r"(sun angle|solar|daylight|shadowing|climate|weather|temperature)",
-            "views": r"(views|framing views|panorama|outlook|vista)",
-            "materials": r"(glass|metal|wood|aluminum|concrete|transparent|opaque)",
-            "pattern": r"(dense|sparse|porous|pattern|parametric)",
-            "structure": r"(lightweight|modular|prefab)",
-        }
+    Repeats the room arithmetic of the emitted apartment script, from the same
+    _APARTMENT_LAYOUT values, so doors can be placed from literal coordinates
+    instead of testing adjacency in Rhino.
+    """
+    layout = _APARTMENT_LAYOUT
+    wall_thickness = layout["wall_thickness"]
+    avg_room_width = width / 2
+    avg_room_depth = (depth - layout["service_depth"]) / 2
+    hall_width = layout["hall_width"]
+    hall_x = (width - hall_width) / 2
+    hall_y = wall_thickness
+    hall_length = depth - 2 * wall_thickness
     
-    def _extract_keywords(self, brief: str) -> Dict[str, List[str]]:
-        """Extract relevant keywords from the design brief using regex patterns."""
-        results = {}
-        
-        # Convert to lowercase for matching
-        brief_lower = brief.lower()
-        
-        # Extract keywords for each category
-        for category, pattern in self.patterns.items():
-            matches = re.findall(pattern, brief_lower)
-            if matches:
-                results[category] = matches
-        
-        return results
+    # (name, x, y, width, depth) in the order the script creates the rooms
+    rooms = []
+    living_width = avg_room_width * layout["living_width_factor"]
+    living_depth = avg_room_depth * layout["living_depth_factor"]
+    master_depth = avg_room_depth * layout["master_depth_factor"]
+    master_y = depth - master_depth - wall_thickness
+    if room_count > 0:
+        rooms.append(("LivingRoom", wall_thickness, wall_thickness, living_width, living_depth))
+    if room_count > 1:
+        master_width = avg_room_width * layout["master_width_factor"]
+        rooms.append(("MasterBedroom", width - master_width - wall_thickness, master_y, master_width, master_depth))
+    if room_count > 2:
+        bed2_width = avg_room_width * layout["bed2_width_factor"]
+        rooms.append(("Bedroom", width - bed2_width - wall_thickness, wall_thickness, bed2_width, avg_room_depth))
+    if room_count > 3:
+        study_width = avg_room_width * layout["study_size_factor"]
+        study_depth = avg_room_depth * layout["study_size_factor"]
+        rooms.append(("Study", wall_thickness, depth - study_depth - wall_thickness, study_width, study_depth))
+    if has_kitchen:
+        rooms.append(("Kitchen", wall_thickness + living_width + hall_width, hall_y,
+                      layout["kitchen_width"], layout["kitchen_depth"]))
+    if has_bathroom:
+        bath_width, bath_depth = layout["bath_width"], layout["bath_depth"]
+        rooms.append(("Bathroom", width - bath_width - wall_thickness, master_y - bath_depth, bath_width, bath_depth))
+    if room_count > 3 and has_bathroom:
+        rooms.append(("Bathroom2", wall_thickness, wall_thickness + living_depth,
+                      layout["bath2_width"], layout["bath2_depth"]))
     
-    def _derive_parameters(self, keywords: Dict[str, List[str]]) -> Dict[str, Any]:
-        """Derive design parameters from extracted keywords."""
-        # Start with default parameters
-        params = self.default_params.copy()
-        
-        # Update based on keywords
-        for category, words in keywords.items():
-            for word in words:
-                if word in self.keyword_mappings:
-                    # Update params with the mappings for this keyword
-                    for key, value in self.keyword_mappings[word].items():
-                        params[key] = value
-        
-        return params
+    # Put the door on the hallway side of the room
+    door_centers = {}
+    for name, x, y, room_width, room_depth in rooms:
+        if x <= hall_x <= x + room_width:
+            # Room is on the left of hallway
+            door_center = [hall_x, y + room_depth / 2, 0]
+        elif x <= hall_x + hall_width <= x + room_width:
+            # Room is on the right of hallway
+            door_center = [hall_x + hall_width, y + room_depth / 2, 0]
+        elif y <= hall_y <= y + room_depth:
+            # Room is above the hallway
+            door_center = [x + room_width / 2, hall_y, 0]
+        elif y <= hall_y + hall_length <= y + room_depth:
+            # Room is below the hallway
+            door_center = [x + room_width / 2, hall_y + hall_length, 0]
+        else:
+            # Default door location
+            door_center = [x + room_width / 2, y, 0]
+        door_centers[name] = door_center
+    return door_centers
+
+
+def _normalize_targets(targets: Sequence[str]) -> Tuple[str, ...]:
+    """Sorted, de-duplicated code targets; a single target may be passed as a plain string."""
+    if isinstance(targets, str):
+        return (targets,)
+    return tuple(sorted(set(targets)))
+
+
+def _dumps_response(response: Union[Dict[str, Any], List[Dict[str, Any]]]) -> str:
+    """Serialize a tool response as indented JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(response, option=orjson.OPT_INDENT_2).decode("utf-8")
+    # orjson writes UTF-8 as is, so keep non-ASCII text unescaped here too
+    return json.dumps(response, indent=2, ensure_ascii=False)
+
+
+def _face_braces(fixed_axis: int, fixed_value: float, along: List[float],
+                 levels: List[float]) -> List[Tuple[float, ...]]:
+    """
+    X-brace diagonals of one perimeter face lying in the plane where coordinate
+    `fixed_axis` (0 for X, 1 for Y) equals `fixed_value`. The face runs along the
+    other axis through the grid coordinates `along`, up through the floor `levels`.
     
-    def _generate_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate a sequence of parametric operations based on the parameters and design domain."""
-        operations = []
-        
-        # Determine which design domain to use
-        design_domain = params.get("design_domain", "facade")
-        
-        # Common initial operations for all domains
-        operations.append({
-            "operation": "initialize_design",
-            "params": {
-                "design_domain": design_domain,
-                "grid_size": params["grid_size"],
-                "material": params["material"],
-                "color_scheme": params["color_scheme"]
-            }
-        })
-        
-        # Domain-specific operations
-        if design_domain == "facade":
-            operations.extend(self._generate_facade_operations(params))
-        elif design_domain == "floor_plan":
-            operations.extend(self._generate_floor_plan_operations(params))
-        elif design_domain == "urban":
-            operations.extend(self._generate_urban_operations(params))
-        elif design_domain == "landscape":
-            operations.extend(self._generate_landscape_operations(params))
-        elif design_domain == "structure":
-            operations.extend(self._generate_structure_operations(params))
-        elif design_domain == "parametric_form":
-            operations.extend(self._generate_parametric_form_operations(params))
-        
-        # Final operation for all domains
-        operations.append({
-            "operation": "finalize_design",
-            "params": {
-                "design_domain": design_domain,
-                "export_format": "3dm",
-                "add_metadata": True
-            }
-        })
-        
-        return operations
+    Each diagonal is one flat (x0, y0, z0, x1, y1, z1) tuple.
+    """
+    bays, num_floors = len(along) - 1, len(levels) - 1
     
-    def _generate_facade_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate operations specific to facade design."""
-        operations = []
-        
-        # Define the building envelope
-        operations.append({
-            "operation": "create_building_envelope",
-            "params": {
-                "story_count": params["story_count"],
-                "floor_height": params["floor_height"],
-                "grid_size": params["grid_size"]
-            }
-        })
-        
-        # Create the facade system
-        operations.append({
-            "operation": "create_facade_system",
-            "params": {
-                "offset": params["facade_offset"],
-                "panel_type": params["panel_type"],
-                "panel_density": params["panel_density"],
-                "material": params["material"],
-                "structural_system": params["structural_system"]
-            }
-        })
-        
-        # If responsive, add environmental analysis
-        if params["responsive_panels"]:
-            operations.append({
-                "operation": "analyze_sun_angles",
-                "params": {
-                    "priority": params["sun_priority"]
-                }
-            })
-            
-            operations.append({
-                "operation": "analyze_view_corridors",
-                "params": {
-                    "priority": params["view_priority"]
-                }
-            })
-            
-            operations.append({
-                "operation": "generate_panel_rotations",
-                "params": {
-                    "rotation_limit": params["panel_rotation_limit"],
-                    "sun_priority": params["sun_priority"],
-                    "view_priority": params["view_priority"]
-                }
-            })
-        
-        # Generate the facade geometry
-        operations.append({
-            "operation": "generate_facade_geometry",
-            "params": params
-        })
-        
-        return operations
+    # Diagonal from (a0, za) to (a1, zb) in face coordinates, as one flat tuple
+    if fixed_axis == 0:
+        def diagonal(a0, za, a1, zb):
+            return (fixed_value, a0, za, fixed_value, a1, zb)
+    else:
+        def diagonal(a0, za, a1, zb):
+            return (a0, fixed_value, za, a1, fixed_value, zb)
     
-    def _generate_floor_plan_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate operations specific to floor plan design."""
-        operations = []
-        
-        # Create the floor boundary
-        operations.append({
-            "operation": "create_floor_boundary",
-            "params": {
-                "area": params["floor_area"],
-                "proportions": "rectangular"
-            }
-        })
-        
-        # Generate program zones
-        operations.append({
-            "operation": "generate_program_zones",
-            "params": {
-                "program_type": params["program_type"],
-                "room_count": params["room_count"],
-                "open_plan": params["open_plan"]
-            }
-        })
-        
-        # Create circulation
-        operations.append({
-            "operation": "create_circulation",
-            "params": {
-                "corridor_width": params["corridor_width"],
-                "room_division": params["room_division"]
-            }
-        })
-        
-        # Create interior partitions
-        if not params["open_plan"]:
-            operations.append({
-                "operation": "create_partitions",
-                "params": {
-                    "room_division": params["room_division"],
-                    "room_count": params["room_count"]
-                }
-            })
-        
-        # Place furniture and fixtures
-        operations.append({
-            "operation": "place_furniture",
-            "params": {
-                "program_type": params["program_type"],
-                "density": 0.7
-            }
-        })
-        
-        return operations
+    # One flat pass over the cells, bays outermost
+    braces = []
+    for cell in range(max(bays, 0) * num_floors):
+        bay, floor = divmod(cell, num_floors)
+        a0, a1 = along[bay], along[bay + 1]
+        z0, z1 = levels[floor], levels[floor + 1]
+        braces.append(diagonal(a0, z0, a1, z1))
+        braces.append(diagonal(a0, z1, a1, z0))
+    return braces
+
+
+def _brace_endpoints(grid_x: int, grid_y: int, num_floors: int,
+                     grid_size: float, floor_height: float) -> List[Tuple[float, ...]]:
+    """
+    Start and end point of every perimeter X-brace diagonal, as flat
+    (x0, y0, z0, x1, y1, z1) tuples.
     
-    def _generate_urban_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate operations specific to urban design."""
-        operations = []
-        
-        # Create site boundary
-        operations.append({
-            "operation": "create_site_boundary",
-            "params": {
-                "site_area": params["block_size"] * params["block_size"] * 4,
-                "site_proportions": "rectangular"
-            }
-        })
-        
-        # Generate street network
-        operations.append({
-            "operation": "generate_street_network",
-            "params": {
-                "block_size": params["block_size"],
-                "street_width": params["street_width"],
-                "network_type": "grid"
-            }
-        })
-        
-        # Create building footprints
-        operations.append({
-            "operation": "create_building_footprints",
-            "params": {
-                "coverage": params["building_coverage"],
-                "density": params["density"]
-            }
-        })
-        
-        # Generate building massing
-        operations.append({
-            "operation": "generate_building_massing",
-            "params": {
-                "height_avg": params["building_height_avg"],
-                "height_variation": 0.3,
-                "mixed_use": params["mixed_use"]
-            }
-        })
-        
-        # Add public spaces
-        operations.append({
-            "operation": "add_public_spaces",
-            "params": {
-                "ratio": 0.2,
-                "distribution": "central"
-            }
-        })
-        
-        return operations
-    
-    def _generate_landscape_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate operations specific to landscape design."""
-        operations = []
-        
-        # Create site terrain
-        operations.append({
-            "operation": "create_terrain",
-            "params": {
-                "area": 10000,
-                "complexity": params["terrain_complexity"],
-                "height_variation": params["topography_variation"]
-            }
-        })
-        
-        # Generate path network
-        operations.append({
-            "operation": "generate_path_network",
-            "params": {
-                "complexity": params["path_complexity"],
-                "path_width": 2.0
-            }
-        })
-        
-        # Add vegetation
-        operations.append({
-            "operation": "add_vegetation",
-            "params": {
-                "density": params["vegetation_density"],
-                "types": ["trees", "shrubs", "ground_cover"]
-            }
-        })
-        
-        # Add water features if requested
-        if params["water_features"]:
-            operations.append({
-                "operation": "add_water_features",
-                "params": {
-                    "type": "pond",
-                    "area_ratio": 0.15
-                }
-            })
-        
-        # Add site furniture
-        operations.append({
-            "operation": "add_site_furniture",
-            "params": {
-                "density": 0.5
-            }
-        })
-        
-        return operations
+    Faces come front, back, left, right; every bay and floor contributes the
+    lower-left to upper-right diagonal followed by the upper-left to lower-right one.
+    """
+    # Grid coordinates and floor levels, computed once for all four faces
+    xs = [i * grid_size for i in range(grid_x)]
+    ys = [j * grid_size for j in range(grid_y)]
+    zs = [floor * floor_height for floor in range(num_floors + 1)]
+    far_x = (grid_x - 1) * grid_size
+    far_y = (grid_y - 1) * grid_size
     
-    def _generate_structure_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate operations specific to structural design."""
-        operations = []
-        
-        # Create structural grid
-        operations.append({
-            "operation": "create_structural_grid",
-            "params": {
-                "grid_size": params["structural_grid"],
-                "system_type": params["structural_system"]
-            }
-        })
-        
-        # Generate columns
-        operations.append({
-            "operation": "generate_columns",
-            "params": {
-                "dimensions": params["column_dimensions"],
-                "material": params["structural_material"]
-            }
-        })
-        
-        # Generate beams
-        operations.append({
-            "operation": "generate_beams",
-            "params": {
-                "depth": params["beam_depth"],
-                "material": params["structural_material"]
-            }
-        })
-        
-        # Generate floor slabs
-        operations.append({
-            "operation": "generate_floor_slabs",
-            "params": {
-                "thickness": 0.2,
-                "material": params["structural_material"]
-            }
-        })
-        
-        # Create lateral system
-        operations.append({
-            "operation": "create_lateral_system",
-            "params": {
-                "type": "bracing",
-                "material": params["structural_material"]
-            }
-        })
-        
-        return operations
+    braces = []
     
-    def _generate_parametric_form_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate operations specific to parametric form generation."""
-        operations = []
-        
-        # Create base geometry
-        operations.append({
-            "operation": "create_base_geometry",
-            "params": {
-                "type": "box",
-                "dimensions": [10, 10, 10]
-            }
-        })
-        
-        # Apply subdivision
-        operations.append({
-            "operation": "apply_subdivision",
-            "params": {
-                "level": params["subdivision_level"],
-                "method": "catmull-clark"
-            }
-        })
-        
-        # Create attractor points
-        operations.append({
-            "operation": "create_attractors",
-            "params": {
-                "count": params["attractor_points"],
-                "influence": 0.7
-            }
-        })
-        
-        # Apply deformation
-        operations.append({
-            "operation": "apply_deformation",
-            "params": {
-                "iterations": params["iterations"],
-                "strength": params["complexity"]
-            }
-        })
-        
-        # Apply symmetry if requested
-        if params["symmetry"] != "none":
-            operations.append({
-                "operation": "apply_symmetry",
-                "params": {
-                    "type": params["symmetry"],
-                    "preserve_original": True
-                }
-            })
-        
-        return operations
+    # One descriptor per perimeter face: the held axis, its value and the grid
+    # coordinates the face runs along (front and back along X, left and right along Y)
+    faces = (
+        ("front", 1, 0.0, xs),
+        ("back", 1, far_y, xs),
+        ("left", 0, 0.0, ys),
+        ("right", 0, far_x, ys),
+    )
+    for _face, fixed_axis, fixed_value, along in faces:
+        braces.extend(_face_braces(fixed_axis, fixed_value, along, zs))
     
-    def _generate_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
-        """Generate Rhino Python code from operations list."""
-        if not operations:
-            return "# No operations to generate code from"
-        
-        # Extract design domain from the first operation
-        design_domain = operations[0]["params"].get("design_domain", "facade")
-        
-        # Common header code
-        header_code = """
+    return braces
+
+
+# Structural member colors (RGB) by material, resolved when the code is generated
+_STRUCTURE_MATERIAL_COLORS = {
+    "concrete": [200, 200, 200],
+    "steel": [100, 100, 120],
+    "timber": [180, 150, 100],
+}
+
+# Rhino code templates, defined once at import time rather than rebuilt per call
+_RHINO_HEADER_TMPL = """
 import rhinoscriptsyntax as rs
 import random
 import math
 import System.Drawing  # For colors
+import Rhino
+import scriptcontext as sc
 
 # Clear existing geometry
 if not 'preserve_existing' in locals() or not preserve_existing:
@@ -512,10 +327,40 @@ if not 'preserve_existing' in locals() or not preserve_existing:
     for layer in unlocked_layers:
         rs.DeleteObjects(rs.ObjectsByLayer(layer))
 
+# Helper functions to create layers that do not exist yet, straight through the
+# document layer table; full paths like "Parent::Child" create missing parents too
+def layer_index(name, color=None):
+    layer_table = sc.doc.Layers
+    index = layer_table.FindByFullPath(name, -1)
+    if index < 0:
+        parent, _, leaf = name.rpartition("::")
+        layer = Rhino.DocObjects.Layer()
+        layer.Name = leaf
+        if parent:
+            layer.ParentLayerId = layer_table[layer_index(parent)].Id
+        if color:
+            layer.Color = System.Drawing.Color.FromArgb(*color)
+        index = layer_table.Add(layer)
+    return index
+
+def ensure_layers(layers):
+    for name, color in layers:
+        layer_index(name, color)
+    return [name for name, color in layers]
+
+def ensure_layer(name, color=None):
+    layer_index(name, color)
+    return name
+
+# Plane parallel to world XY with its origin at the given point, built directly
+# instead of moving a fresh rs.WorldXYPlane()
+def xy_plane(x, y, z=0):
+    return Rhino.Geometry.Plane(
+        Rhino.Geometry.Point3d(x, y, z), Rhino.Geometry.Vector3d.XAxis, Rhino.Geometry.Vector3d.YAxis
+    )
+
 # Create a layer for the design
-design_layer = "Design_{0}"
-if not rs.IsLayer(design_layer):
-    rs.AddLayer(design_layer)
+design_layer = ensure_layer("Design_{0}")
 rs.CurrentLayer(design_layer)
 
 # Helper function to add metadata to objects
@@ -524,56 +369,46 @@ def add_object_metadata(obj_id, name, description):
         rs.SetUserText(obj_id, "Name", name)
         rs.SetUserText(obj_id, "Description", description)
         rs.SetUserText(obj_id, "CreatedAt", str(System.DateTime.Now))
-""".format(design_domain.replace(" ", "_"))
-
-        # Select the appropriate domain-specific code generator
-        domain_code = ""
-        if design_domain == "facade":
-            domain_code = self._generate_facade_rhino_code(operations)
-        elif design_domain == "floor_plan" or design_domain == "floor layout":
-            domain_code = self._generate_floor_plan_rhino_code(operations)
-        elif design_domain == "urban" or design_domain == "urban design":
-            domain_code = self._generate_urban_rhino_code(operations)
-        elif design_domain == "landscape" or design_domain == "landscape design":
-            domain_code = self._generate_landscape_rhino_code(operations)
-        elif design_domain == "structure" or design_domain == "structural":
-            domain_code = self._generate_structure_rhino_code(operations)
-        elif design_domain == "parametric_form" or design_domain == "form":
-            domain_code = self._generate_parametric_form_rhino_code(operations)
-        else:
-            # Default to facade if unknown domain
-            domain_code = self._generate_facade_rhino_code(operations)
-            
-        # Common ending code
-        ending_code = """
+"""
+
+# Static halves of the header around the design layer name, so a script only splices
+# the name in instead of re-scanning the whole header with str.format
+_RHINO_HEADER_PRE, _RHINO_HEADER_POST = _RHINO_HEADER_TMPL.split("{0}")
+
+_RHINO_REDRAW_OFF = """
+# Suspend viewport redraws while the design is built
+rs.EnableRedraw(False)
+try:
+"""
+
+_RHINO_REDRAW_ON = """
+finally:
+    # Redraw once, even if the design script failed part way
+    rs.EnableRedraw(True)
+    sc.doc.Views.Redraw()
+"""
+
+_RHINO_FOOTER = """
 # Zoom extents to show the entire design
 rs.ZoomExtents()
 
 # Final message
 print("Design generated successfully")
 """
-        
-        # Combine all code sections
-        full_code = header_code + domain_code + ending_code
-        
-        return full_code
-    
-    def _generate_facade_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
-        """Generate Rhino code for facade design operations."""
-        code = ""
-        
-        # Extract parameters from operations
-        params = {}
-        for op in operations:
-            # This will gather all parameters into one dictionary
-            params.update(op.get("params", {}))
-        
-        # Create building envelope
-        code += """
+
+
+# Every domain body runs inside the script's redraw try block, so its templates
+# carry that indentation and are written straight into the one output buffer
+def _body_template(text: str) -> str:
+    """Indent a domain body template into the redraw try block, once at import time."""
+    return textwrap.indent(text, "    ")
+
+
+_FACADE_ENVELOPE_TMPL = _body_template("""
 # Create building envelope
-width = 20.0  # Building width in meters
+width = {width}  # Building width in meters
 length = 30.0  # Building length in meters
-height = {0} * {1}  # Total height
+height = {story_count} * {floor_height}  # Total height
 
 # Create base rectangle
 base_rect = rs.AddRectangle(rs.WorldXYPlane(), width, length)
@@ -583,53 +418,75 @@ add_object_metadata(base_srf, "BuildingBase", "Base of the building")
 # Extrude to create building volume
 building_volume = rs.ExtrudeSurface(base_srf, rs.VectorScale(rs.WorldZVector(), height))
 add_object_metadata(building_volume, "BuildingVolume", "Main building volume")
-""".format(params.get("story_count", 5), params.get("floor_height", 3.0))
+""")
 
-        # Create facade system
-        code += """
+_FACADE_GRID_TMPL = _body_template("""
 # Create facade grid with panels
-grid_size = {0}  # Size of each grid cell
-panel_density = {1}  # Probability of creating a panel at a grid position
+grid_size = {grid_size}  # Size of each grid cell
+panel_density = {panel_density}  # Probability of creating a panel at a grid position
 
 # North facade
 north_face = rs.CopyObject(rs.AddRectangle(rs.PlaneFromPoints([0,length,0], [width,length,0], [0,length,height]), width, height))
 north_facade_grid = []
+nx, nz = int(width/grid_size), int(height/grid_size)
+""")
+
+_FACADE_POSITIONS_NUMPY_TMPL = _body_template("""
+# Pick panel positions; NumPy draws the whole density mask in one call when available
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    panel_positions = [(int(x), int(z)) for x, z in np.argwhere(np.random.rand(nx, nz) < panel_density)]
+else:
+    local_rand = random.random
+    panel_positions = [(x, z) for x in range(nx) for z in range(nz) if local_rand() < panel_density]
+""")
+
+_FACADE_POSITIONS_PLAIN_TMPL = _body_template("""
+# Pick panel positions
+local_rand = random.random
+panel_positions = [(x, z) for x in range(nx) for z in range(nz) if local_rand() < panel_density]
+""")
+
+_FACADE_PANELS_TMPL = _body_template("""
+# Bind the Rhino calls used per panel once, outside the loop
+local_add_rectangle = rs.AddRectangle
+local_plane = Rhino.Geometry.Plane
+local_point = Rhino.Geometry.Point3d
+local_add_planar_srf = rs.AddPlanarSrf
+local_extrude_surface = rs.ExtrudeSurface
+
+# Panel plane axes (X along the facade, Y up) and extrusion vector are the same for every panel
+x_axis = Rhino.Geometry.Vector3d.XAxis
+z_axis = Rhino.Geometry.Vector3d.ZAxis
+extrude_vector = rs.VectorScale([0,-1,0], {panel_depth})
+panel_size = grid_size*0.8
 
 # Create grid for north facade
-for x in range(int(width/grid_size)):
-    for z in range(int(height/grid_size)):
-        # Apply panel density
-        if random.random() < panel_density:
-            # Create panel at this position
-            panel_center = [x*grid_size + grid_size/2, length + {2}, z*grid_size + grid_size/2]
-            panel = rs.AddRectangle(rs.PlaneFromPoints(
-                [panel_center[0]-grid_size*0.4, panel_center[1], panel_center[2]-grid_size*0.4],
-                [panel_center[0]+grid_size*0.4, panel_center[1], panel_center[2]-grid_size*0.4],
-                [panel_center[0]-grid_size*0.4, panel_center[1], panel_center[2]+grid_size*0.4]
-            ), grid_size*0.8, grid_size*0.8)
-            
-            # Extrude to create 3D panel
-            panel_srf = rs.AddPlanarSrf(panel)
-            panel_obj = rs.ExtrudeSurface(panel_srf, rs.VectorScale([0,-1,0], {3}))
-            
-            # Add metadata
-            panel_name = "Panel_N_{0}_{1}".format(x, z)  # Using .format instead of f-string
-            add_object_metadata(panel_obj, panel_name, "North Facade Panel")
-            north_facade_grid.append({{"obj": panel_obj, "pos": [x, z], "center": panel_center}})
+for x, z in panel_positions:
+    # Create panel at this position
+    panel_center = [x*grid_size + grid_size/2, length + {facade_offset}, z*grid_size + grid_size/2]
+    panel_plane = local_plane(local_point(panel_center[0]-grid_size*0.4, panel_center[1], panel_center[2]-grid_size*0.4), x_axis, z_axis)
+    panel = local_add_rectangle(panel_plane, panel_size, panel_size)
+    
+    # Extrude to create 3D panel
+    panel_srf = local_add_planar_srf(panel)
+    panel_obj = local_extrude_surface(panel_srf, extrude_vector)
+    
+    # Add metadata
+    panel_name = "Panel_N_{{0}}_{{1}}".format(x, z)  # Using .format instead of f-string
+    add_object_metadata(panel_obj, panel_name, "North Facade Panel")
+    north_facade_grid.append({{"obj": panel_obj, "pos": [x, z], "center": panel_center}})
 
 # Similarly for other facades...
-""".format(
-            params.get("grid_size", 1.0),
-            params.get("panel_density", 0.8),
-            params.get("facade_offset", 0.5),
-            params.get("panel_depth", 0.2)
-        )
+""")
 
-        # Add sun analysis if responsive
-        if params.get("responsive_panels", True):
-            code += """
+_FACADE_SUN_TMPL = _body_template("""
 # Simulate sun angle analysis
-sun_priority = {0}  # Priority for sun shading (0-1)
+sun_priority = {sun_priority}  # Priority for sun shading (0-1)
 
 # Create a sun vector for analysis (pointing south at 45-degree altitude)
 sun_vector = rs.VectorUnitize([0, -1, -1])
@@ -639,11 +496,11 @@ sun_arrow = rs.AddLine([width/2, length/2, height+5],
                        [width/2 + sun_vector[0]*10, length/2 + sun_vector[1]*10, height+5 + sun_vector[2]*10])
 rs.ObjectColor(sun_arrow, [255, 200, 0])
 add_object_metadata(sun_arrow, "SunVector", "Visualization of sun direction used for analysis")
-""".format(params.get("sun_priority", 0.8))
+""")
 
-            code += """
+_FACADE_VIEW_TMPL = _body_template("""
 # Simulate view corridor analysis
-view_priority = {0}  # Priority for preserving views (0-1)
+view_priority = {view_priority}  # Priority for preserving views (0-1)
 
 # Define key view directions (e.g., toward north)
 view_vector = rs.VectorUnitize([0, 1, 0])
@@ -653,1138 +510,1870 @@ view_arrow = rs.AddLine([width/2, length/2, height/2],
                         [width/2 + view_vector[0]*10, length/2 + view_vector[1]*10, height/2 + view_vector[2]*0])
 rs.ObjectColor(view_arrow, [0, 200, 255])
 add_object_metadata(view_arrow, "ViewVector", "Visualization of main view direction")
-""".format(params.get("view_priority", 0.7))
+""")
 
-            # Panel rotations
-            code += """
+_FACADE_ROTATION_TMPL = _body_template("""
 # Apply panel rotations based on environmental factors
-max_rotation = {0}  # Maximum rotation angle in degrees
-sun_priority = {1}
-view_priority = {2}
+max_rotation = {panel_rotation_limit}  # Maximum rotation angle in degrees
+sun_priority = {sun_priority}
+view_priority = {view_priority}
+
+# Rotation angle for every panel: a wave pattern based on normalized position,
+# more closed for sun priority and more open where views matter
+def panel_angles(xs, zs, out, max_rot, sun_p, view_p):
+    local_sin = math.sin
+    local_cos = math.cos
+    pi = math.pi
+    for i in range(len(xs)):
+        x_pos = xs[i]
+        z_pos = zs[i]
+        out[i] = (max_rot * local_sin(x_pos * pi * 2) * local_cos(z_pos * pi * 3)
+                  + max_rot * 0.5 * sun_p
+                  - max_rot * 0.3 * local_sin(x_pos * pi) * view_p)
+    return out
+
+# Normalized (0-1) panel positions
+panel_xs = [panel["pos"][0] / (width/grid_size) for panel in north_facade_grid]
+panel_zs = [panel["pos"][1] / (height/grid_size) for panel in north_facade_grid]
+""")
+
+_FACADE_ANGLES_NUMBA_TMPL = _body_template("""
+# Compile the angle kernel with Numba when it is available in this Rhino Python
+try:
+    from numba import njit
+    import numpy as np
+    angles = njit(fastmath=True)(panel_angles)(
+        np.array(panel_xs), np.array(panel_zs), np.empty(len(panel_xs)),
+        max_rotation, sun_priority, view_priority
+    )
+except ImportError:
+    angles = panel_angles(panel_xs, panel_zs, [0.0] * len(panel_xs), max_rotation, sun_priority, view_priority)
+""")
+
+_FACADE_ANGLES_PLAIN_TMPL = _body_template("""
+angles = panel_angles(panel_xs, panel_zs, [0.0] * len(panel_xs), max_rotation, sun_priority, view_priority)
+""")
 
+_FACADE_ROTATION_APPLY_TMPL = _body_template("""
 # Apply rotations to north facade panels
-for panel in north_facade_grid:
-    # Calculate rotation based on position
-    # This is a simplified example - in reality, would be based on detailed analysis
-    x_pos = panel["pos"][0] / (width/grid_size)  # Normalized x position (0-1)
-    z_pos = panel["pos"][1] / (height/grid_size)  # Normalized z position (0-1)
-    
-    # Calculate rotation angle based on position, sun and view priorities
-    # This creates a wave pattern that's different for each panel
-    angle = max_rotation * math.sin(x_pos * math.pi * 2) * math.cos(z_pos * math.pi * 3)
-    
-    # Adjust based on sun priority (more closed on south facade)
-    angle += max_rotation * 0.5 * sun_priority
-    
-    # Adjust based on view priority (more open on facades with good views)
-    view_factor = math.sin(x_pos * math.pi) * view_priority
-    angle -= max_rotation * 0.3 * view_factor
-    
+local_add_line = rs.AddLine
+local_rotate_object = rs.RotateObject
+local_delete_object = rs.DeleteObject
+for panel, angle in zip(north_facade_grid, angles):
     # Apply rotation
-    rotation_axis = rs.AddLine(
-        [panel["center"][0], panel["center"][1] + {3}/2, panel["center"][2]],
-        [panel["center"][0], panel["center"][1] - {3}/2, panel["center"][2]]
+    rotation_axis = local_add_line(
+        [panel["center"][0], panel["center"][1] + {panel_depth}/2, panel["center"][2]],
+        [panel["center"][0], panel["center"][1] - {panel_depth}/2, panel["center"][2]]
     )
-    rs.RotateObject(panel["obj"], panel["center"], angle, rotation_axis, copy=False)
+    local_rotate_object(panel["obj"], panel["center"], float(angle), rotation_axis, copy=False)
     
     # Delete the temporary rotation axis
-    rs.DeleteObject(rotation_axis)
-""".format(
-                params.get("panel_rotation_limit", 45),
-                params.get("sun_priority", 0.8),
-                params.get("view_priority", 0.7),
-                params.get("panel_depth", 0.2)
-            )
+    local_delete_object(rotation_axis)
+""")
 
-        # Material application
-        code += """
+_FACADE_MATERIAL_TMPL = _body_template("""
 # Add colorization by material
-material_color = {{
-    "glass": [150, 210, 255, 100],
-    "metal": [180, 180, 190, 255],
-    "wood": [185, 122, 87, 255],
-    "aluminum": [200, 200, 210, 255],
-    "concrete": [180, 180, 170, 255],
-    "solid": [120, 120, 120, 255]
-}}["{0}"]
+material_color = {material_color}  # {material}
 
 # Apply material color to all panels
 all_panels = rs.ObjectsByLayer(design_layer)
 for panel in all_panels:
     if "Panel" in rs.GetUserText(panel, "Name", ""):
         rs.ObjectColor(panel, material_color)
-""".format(params.get("material", "glass"))
+""")
 
-        return code
-    
-    def _generate_floor_plan_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
-        """Generate Rhino code for floor plan operations."""
-        code = ""
-        
-        # Extract parameters from operations
-        params = {}
-        for op in operations:
-            params.update(op.get("params", {}))
-        
-        # Set default parameters
-        width = params.get("width", 15.0)
-        depth = params.get("depth", 12.0)
-        room_count = params.get("room_count", 4)
-        has_balcony = params.get("has_balcony", True)
-        has_bathroom = params.get("has_bathroom", True)
-        has_kitchen = params.get("has_kitchen", True)
-        open_plan = params.get("open_plan", False)
-        unit_type = params.get("unit_type", "apartment")
-        
-        # Create floor plan outline
-        code += """
+_FLOOR_PLAN_SETUP_TMPL = _body_template("""
 # Create floor plan boundary
-width = {0}  # Width in meters
-depth = {1}  # Depth in meters
-outline = rs.AddRectangle(rs.WorldXYPlane(), width, depth)
-outline_srf = rs.AddPlanarSrf(outline)
-add_object_metadata(outline_srf, "FloorPlanBoundary", "Main apartment boundary")
-
-# Create walls layer
-walls_layer = "Walls"
-if not rs.IsLayer(walls_layer):
-    rs.AddLayer(walls_layer)
+width = {width}  # Width in meters
+depth = {depth}  # Depth in meters
+room_count = {room_count}
+has_bathroom = {has_bathroom}
+has_kitchen = {has_kitchen}
+
+# Plan geometry is built with RhinoCommon and committed to the document in one batch
+queued_geometry = []
+queued_attributes = []
+tolerance = sc.doc.ModelAbsoluteTolerance
+
+# Attributes on the current layer with optional metadata and object color
+def object_attributes(name=None, description=None, color=None):
+    attrs = Rhino.DocObjects.ObjectAttributes()
+    attrs.LayerIndex = sc.doc.Layers.CurrentLayerIndex
+    if name is not None:
+        attrs.SetUserString("Name", name)
+        attrs.SetUserString("Description", description)
+        attrs.SetUserString("CreatedAt", str(System.DateTime.Now))
+    if color is not None:
+        attrs.ObjectColor = System.Drawing.Color.FromArgb(*color)
+        attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+    return attrs
+
+def queue_object(geometry, name=None, description=None, color=None):
+    queued_geometry.append(geometry)
+    queued_attributes.append(object_attributes(name, description, color))
+
+def line_curve(start, end):
+    return Rhino.Geometry.LineCurve(Rhino.Geometry.Point3d(*start), Rhino.Geometry.Point3d(*end))
+
+def add_line(start, end):
+    curve = line_curve(start, end)
+    queue_object(curve)
+    return curve
+
+def add_text_dot(text, point):
+    queue_object(Rhino.Geometry.TextDot(text, Rhino.Geometry.Point3d(*point)))
+
+# Rectangle outline plus its planar surface; metadata goes on the surface
+def add_area(x, y, area_width, area_depth, name, description):
+    plane = Rhino.Geometry.Plane(Rhino.Geometry.Point3d(x, y, 0), Rhino.Geometry.Vector3d.ZAxis)
+    curve = Rhino.Geometry.Rectangle3d(plane, area_width, area_depth).ToNurbsCurve()
+    queue_object(curve)
+    for srf in Rhino.Geometry.Brep.CreatePlanarBreps(curve, tolerance) or []:
+        queue_object(srf, name, description)
+    return curve
+
+outline = add_area(0, 0, width, depth, "FloorPlanBoundary", "Main apartment boundary")
+
+# Create the wall, label and furniture layers
+walls_layer, text_layer, furniture_layer = ensure_layers([
+    ("Walls", None),
+    ("Labels", None),
+    ("Furniture", [150, 120, 100]),
+])
 rs.CurrentLayer(walls_layer)
 
 # Wall properties
-wall_thickness = 0.2  # Wall thickness in meters
+wall_thickness = {wall_thickness}  # Wall thickness in meters
 ceiling_height = 3.0  # Ceiling height in meters
-""".format(width, depth)
 
-        # Generate different layouts based on unit_type
-        if unit_type == "studio" or (room_count == 1 and open_plan):
-            code += """
+# Wall curves to extrude (exterior walls first)
+wall_curves = [outline]
+
+# Rooms to furnish, kept as parallel lists (one entry per room in each); the
+# furniture category is resolved from the name once, when the room is added
+room_labels = []
+room_categories = []
+room_xs = []
+room_ys = []
+room_widths = []
+room_depths = []
+
+def room_category(name):
+    if name == "LivingRoom":
+        return "living"
+    if "Bedroom" in name:
+        return "bedroom"
+    if name == "Kitchen":
+        return "kitchen"
+    return "other"
+
+def add_room(name, x, y, room_width, room_depth):
+    room_labels.append(name)
+    room_categories.append(room_category(name))
+    room_xs.append(x)
+    room_ys.append(y)
+    room_widths.append(room_width)
+    room_depths.append(room_depth)
+""")
+
+_FLOOR_PLAN_STUDIO_TMPL = _body_template("""
 # Generate studio apartment layout
 # Single open space with bathroom
 
 # Main living space
 main_area_width = width - 2 * wall_thickness
 main_area_depth = depth - 3.5 - 2 * wall_thickness
-main_space = rs.AddRectangle(
-    rs.MovePlane(rs.WorldXYPlane(), [wall_thickness, wall_thickness, 0]),
-    main_area_width,
-    main_area_depth
-)
-main_space_srf = rs.AddPlanarSrf(main_space)
-add_object_metadata(main_space_srf, "LivingSpace", "Combined living/sleeping area")
+add_area(wall_thickness, wall_thickness, main_area_width, main_area_depth, "LivingSpace", "Combined living/sleeping area")
 
 # Bathroom
 bath_width = 2.0
 bath_depth = 3.0
 bath_x = width - bath_width - wall_thickness
 bath_y = depth - bath_depth - wall_thickness
-bathroom = rs.AddRectangle(
-    rs.MovePlane(rs.WorldXYPlane(), [bath_x, bath_y, 0]),
-    bath_width,
-    bath_depth
-)
-bathroom_srf = rs.AddPlanarSrf(bathroom)
-add_object_metadata(bathroom_srf, "Bathroom", "Bathroom")
+add_area(bath_x, bath_y, bath_width, bath_depth, "Bathroom", "Bathroom")
+add_room("Bathroom", bath_x, bath_y, bath_width, bath_depth)
 
 # Kitchen area
 kitchen_width = 3.0
 kitchen_depth = 2.0
 kitchen_x = wall_thickness
 kitchen_y = depth - kitchen_depth - wall_thickness
-kitchen = rs.AddRectangle(
-    rs.MovePlane(rs.WorldXYPlane(), [kitchen_x, kitchen_y, 0]),
-    kitchen_width,
-    kitchen_depth
-)
-kitchen_srf = rs.AddPlanarSrf(kitchen)
-add_object_metadata(kitchen_srf, "Kitchen", "Kitchen area")
-
-# Create walls by extruding curves
-wall_curves = []
-
-# Exterior walls
-wall_curves.append(outline)
+add_area(kitchen_x, kitchen_y, kitchen_width, kitchen_depth, "Kitchen", "Kitchen area")
+add_room("Kitchen", kitchen_x, kitchen_y, kitchen_width, kitchen_depth)
 
 # Interior walls
 # Bathroom walls
-bath_wall1 = rs.AddLine([bath_x, bath_y, 0], [bath_x + bath_width, bath_y, 0])
-bath_wall2 = rs.AddLine([bath_x, bath_y, 0], [bath_x, bath_y + bath_depth, 0])
+bath_wall1 = line_curve([bath_x, bath_y, 0], [bath_x + bath_width, bath_y, 0])
+bath_wall2 = line_curve([bath_x, bath_y, 0], [bath_x, bath_y + bath_depth, 0])
 wall_curves.extend([bath_wall1, bath_wall2])
 
 # Kitchen separation (half wall or counter)
-kitchen_wall = rs.AddLine([kitchen_x + kitchen_width, kitchen_y, 0], [kitchen_x + kitchen_width, kitchen_y + kitchen_depth, 0])
+kitchen_wall = line_curve([kitchen_x + kitchen_width, kitchen_y, 0], [kitchen_x + kitchen_width, kitchen_y + kitchen_depth, 0])
 wall_curves.append(kitchen_wall)
 
 # Door openings
 door_width = 0.9
 # Bathroom door
 bath_door_center = [bath_x + bath_width/2, bath_y, 0]
-bath_door = rs.AddLine(
+add_line(
     [bath_door_center[0] - door_width/2, bath_door_center[1], 0],
     [bath_door_center[0] + door_width/2, bath_door_center[1], 0]
 )
-rs.AddTextDot("Door", bath_door_center)
+add_text_dot("Door", bath_door_center)
 
 # Main entrance door
 entrance_door_center = [width / 2, wall_thickness, 0]
-entrance_door = rs.AddLine(
+add_line(
     [entrance_door_center[0] - door_width/2, entrance_door_center[1], 0],
     [entrance_door_center[0] + door_width/2, entrance_door_center[1], 0]
 )
-rs.AddTextDot("Entrance", entrance_door_center)
-"""
-        elif unit_type == "apartment" or not open_plan:
-            code += """
+add_text_dot("Entrance", entrance_door_center)
+""")
+
+_FLOOR_PLAN_APARTMENT_TMPL = _body_template("""
 # Generate apartment layout with separate rooms
 # Calculate room dimensions based on total room count
 avg_room_width = width / 2
-avg_room_depth = (depth - 5) / 2  # Reserve space for kitchen, bathroom, hallway
+avg_room_depth = (depth - {service_depth}) / 2  # Reserve space for kitchen, bathroom, hallway
 
 # Create a hallway down the middle
-hall_width = 1.2
+hall_width = {hall_width}
 hall_x = (width - hall_width) / 2
 hall_y = wall_thickness
 hall_length = depth - 2 * wall_thickness
-hallway = rs.AddRectangle(
-    rs.MovePlane(rs.WorldXYPlane(), [hall_x, hall_y, 0]),
-    hall_width,
-    hall_length
-)
-hallway_srf = rs.AddPlanarSrf(hallway)
-add_object_metadata(hallway_srf, "Hallway", "Central hallway")
+add_area(hall_x, hall_y, hall_width, hall_length, "Hallway", "Central hallway")
 
 # Add rooms
-room_coords = []
 room_names = ["LivingRoom", "MasterBedroom", "Bedroom", "Study", "DiningRoom"]
 
 if room_count > 0:
     # Living room (always included)
-    living_width = avg_room_width * 1.5
-    living_depth = avg_room_depth * 1.3
+    living_width = avg_room_width * {living_width_factor}
+    living_depth = avg_room_depth * {living_depth_factor}
     living_x = wall_thickness
     living_y = wall_thickness
-    living = rs.AddRectangle(
-        rs.MovePlane(rs.WorldXYPlane(), [living_x, living_y, 0]),
-        living_width,
-        living_depth
-    )
-    living_srf = rs.AddPlanarSrf(living)
-    add_object_metadata(living_srf, room_names[0], "Living room")
-    room_coords.append({{"x": living_x, "y": living_y, "width": living_width, "depth": living_depth, "name": room_names[0]}})
+    add_area(living_x, living_y, living_width, living_depth, room_names[0], "Living room")
+    add_room(room_names[0], living_x, living_y, living_width, living_depth)
 
 if room_count > 1:
     # Master bedroom
-    master_width = avg_room_width * 1.2
-    master_depth = avg_room_depth * 1.2
+    master_width = avg_room_width * {master_width_factor}
+    master_depth = avg_room_depth * {master_depth_factor}
     master_x = width - master_width - wall_thickness
     master_y = depth - master_depth - wall_thickness
-    master = rs.AddRectangle(
-        rs.MovePlane(rs.WorldXYPlane(), [master_x, master_y, 0]),
-        master_width,
-        master_depth
-    )
-    master_srf = rs.AddPlanarSrf(master)
-    add_object_metadata(master_srf, room_names[1], "Master bedroom")
-    room_coords.append({{"x": master_x, "y": master_y, "width": master_width, "depth": master_depth, "name": room_names[1]}})
+    add_area(master_x, master_y, master_width, master_depth, room_names[1], "Master bedroom")
+    add_room(room_names[1], master_x, master_y, master_width, master_depth)
 
 if room_count > 2:
     # Second bedroom
-    bed2_width = avg_room_width * 0.9
+    bed2_width = avg_room_width * {bed2_width_factor}
     bed2_depth = avg_room_depth
     bed2_x = width - bed2_width - wall_thickness
     bed2_y = wall_thickness
-    bed2 = rs.AddRectangle(
-        rs.MovePlane(rs.WorldXYPlane(), [bed2_x, bed2_y, 0]),
-        bed2_width,
-        bed2_depth
-    )
-    bed2_srf = rs.AddPlanarSrf(bed2)
-    add_object_metadata(bed2_srf, room_names[2], "Second bedroom")
-    room_coords.append({{"x": bed2_x, "y": bed2_y, "width": bed2_width, "depth": bed2_depth, "name": room_names[2]}})
+    add_area(bed2_x, bed2_y, bed2_width, bed2_depth, room_names[2], "Second bedroom")
+    add_room(room_names[2], bed2_x, bed2_y, bed2_width, bed2_depth)
 
 if room_count > 3:
     # Study or additional room
-    study_width = avg_room_width * 0.8
-    study_depth = avg_room_depth * 0.8
+    study_width = avg_room_width * {study_size_factor}
+    study_depth = avg_room_depth * {study_size_factor}
     study_x = wall_thickness
     study_y = depth - study_depth - wall_thickness
-    study = rs.AddRectangle(
-        rs.MovePlane(rs.WorldXYPlane(), [study_x, study_y, 0]),
-        study_width,
-        study_depth
-    )
-    study_srf = rs.AddPlanarSrf(study)
-    add_object_metadata(study_srf, room_names[3], "Study/small bedroom")
-    room_coords.append({{"x": study_x, "y": study_y, "width": study_width, "depth": study_depth, "name": room_names[3]}})
+    add_area(study_x, study_y, study_width, study_depth, room_names[3], "Study/small bedroom")
+    add_room(room_names[3], study_x, study_y, study_width, study_depth)
 
 # Kitchen and bathroom
 if has_kitchen:
-    kitchen_width = 3.5
-    kitchen_depth = 3.0
+    kitchen_width = {kitchen_width}
+    kitchen_depth = {kitchen_depth}
     kitchen_x = wall_thickness + living_width + hall_width
     kitchen_y = hall_y
-    kitchen = rs.AddRectangle(
-        rs.MovePlane(rs.WorldXYPlane(), [kitchen_x, kitchen_y, 0]),
-        kitchen_width, 
-        kitchen_depth
-    )
-    kitchen_srf = rs.AddPlanarSrf(kitchen)
-    add_object_metadata(kitchen_srf, "Kitchen", "Kitchen")
-    room_coords.append({{"x": kitchen_x, "y": kitchen_y, "width": kitchen_width, "depth": kitchen_depth, "name": "Kitchen"}})
+    add_area(kitchen_x, kitchen_y, kitchen_width, kitchen_depth, "Kitchen", "Kitchen")
+    add_room("Kitchen", kitchen_x, kitchen_y, kitchen_width, kitchen_depth)
 
 if has_bathroom:
-    bath_width = 2.5
-    bath_depth = 2.0
+    bath_width = {bath_width}
+    bath_depth = {bath_depth}
     bath_x = width - bath_width - wall_thickness
     bath_y = master_y - bath_depth
-    bathroom = rs.AddRectangle(
-        rs.MovePlane(rs.WorldXYPlane(), [bath_x, bath_y, 0]),
-        bath_width,
-        bath_depth
-    )
-    bathroom_srf = rs.AddPlanarSrf(bathroom)
-    add_object_metadata(bathroom_srf, "Bathroom", "Bathroom")
-    room_coords.append({{"x": bath_x, "y": bath_y, "width": bath_width, "depth": bath_depth, "name": "Bathroom"}})
+    add_area(bath_x, bath_y, bath_width, bath_depth, "Bathroom", "Bathroom")
+    add_room("Bathroom", bath_x, bath_y, bath_width, bath_depth)
 
 # Add a second bathroom if the apartment is large enough
 if room_count > 3 and has_bathroom:
-    bath2_width = 2.0
-    bath2_depth = 2.0
+    bath2_width = {bath2_width}
+    bath2_depth = {bath2_depth}
     bath2_x = wall_thickness
     bath2_y = living_y + living_depth
-    bathroom2 = rs.AddRectangle(
-        rs.MovePlane(rs.WorldXYPlane(), [bath2_x, bath2_y, 0]),
-        bath2_width,
-        bath2_depth
-    )
-    bathroom2_srf = rs.AddPlanarSrf(bathroom2)
-    add_object_metadata(bathroom2_srf, "Bathroom2", "Second bathroom")
-    room_coords.append({{"x": bath2_x, "y": bath2_y, "width": bath2_width, "depth": bath2_depth, "name": "Bathroom2"}})
-
-# Create walls by extruding curves
-wall_curves = []
-
-# Exterior walls
-wall_curves.append(outline)
+    add_area(bath2_x, bath2_y, bath2_width, bath2_depth, "Bathroom2", "Second bathroom")
+    add_room("Bathroom2", bath2_x, bath2_y, bath2_width, bath2_depth)
 
 # Interior walls (between rooms)
-for room in room_coords:
+for x, y, room_width, room_depth in zip(room_xs, room_ys, room_widths, room_depths):
     # Horizontal walls
-    if room["name"] != "Hallway":
-        wall_h1 = rs.AddLine([room["x"], room["y"], 0], [room["x"] + room["width"], room["y"], 0])
-        wall_h2 = rs.AddLine([room["x"], room["y"] + room["depth"], 0], [room["x"] + room["width"], room["y"] + room["depth"], 0])
-        # Vertical walls
-        wall_v1 = rs.AddLine([room["x"], room["y"], 0], [room["x"], room["y"] + room["depth"], 0])
-        wall_v2 = rs.AddLine([room["x"] + room["width"], room["y"], 0], [room["x"] + room["width"], room["y"] + room["depth"], 0])
-        wall_curves.extend([wall_h1, wall_h2, wall_v1, wall_v2])
+    wall_h1 = line_curve([x, y, 0], [x + room_width, y, 0])
+    wall_h2 = line_curve([x, y + room_depth, 0], [x + room_width, y + room_depth, 0])
+    # Vertical walls
+    wall_v1 = line_curve([x, y, 0], [x, y + room_depth, 0])
+    wall_v2 = line_curve([x + room_width, y, 0], [x + room_width, y + room_depth, 0])
+    wall_curves.extend([wall_h1, wall_h2, wall_v1, wall_v2])
 
-# Door openings
-door_width = 0.9
-# Add doors to each room
-for room in room_coords:
-    if room["name"] != "Hallway":
-        # Add door on the hallway side of the room
-        if room["x"] <= hall_x and (room["x"] + room["width"]) >= hall_x:
-            # Room is on the left of hallway
-            door_center = [hall_x, room["y"] + room["depth"]/2, 0]
-        elif room["x"] <= (hall_x + hall_width) and (room["x"] + room["width"]) >= (hall_x + hall_width):
-            # Room is on the right of hallway
-            door_center = [hall_x + hall_width, room["y"] + room["depth"]/2, 0]
-        elif room["y"] <= hall_y and (room["y"] + room["depth"]) >= hall_y:
-            # Room is above the hallway
-            door_center = [room["x"] + room["width"]/2, hall_y, 0]
-        elif room["y"] <= (hall_y + hall_length) and (room["y"] + room["depth"]) >= (hall_y + hall_length):
-            # Room is below the hallway
-            door_center = [room["x"] + room["width"]/2, hall_y + hall_length, 0]
-        else:
-            # Default door location
-            door_center = [room["x"] + room["width"]/2, room["y"], 0]
-        
-        rs.AddTextDot(room["name"], [room["x"] + room["width"]/2, room["y"] + room["depth"]/2, 0])
-        rs.AddTextDot("Door", door_center)
+""")
+
+_FLOOR_PLAN_DOORS_TMPL = _body_template("""
+# Room labels
+for name, x, y, room_width, room_depth in zip(room_labels, room_xs, room_ys, room_widths, room_depths):
+    add_text_dot(name, [x + room_width/2, y + room_depth/2, 0])
+
+# Door openings on the hallway side of each room
+door_centers = {door_centers!r}
+for door_center in door_centers.values():
+    add_text_dot("Door", door_center)
 
 # Main entrance door
 entrance_door_center = [hall_x + hall_width/2, wall_thickness, 0]
-rs.AddTextDot("Entrance", entrance_door_center)
-"""
-        
-        # Add balcony if requested
-        if has_balcony:
-            code += """
+add_text_dot("Entrance", entrance_door_center)
+""")
+
+_FLOOR_PLAN_BALCONY_TMPL = _body_template("""
 # Add balcony
 balcony_depth = 2.0
 balcony_width = width / 3
 balcony_x = width - balcony_width - wall_thickness
 balcony_y = -balcony_depth
-balcony = rs.AddRectangle(
-    rs.MovePlane(rs.WorldXYPlane(), [balcony_x, balcony_y, 0]),
-    balcony_width,
-    balcony_depth
-)
-balcony_srf = rs.AddPlanarSrf(balcony)
-add_object_metadata(balcony_srf, "Balcony", "Outdoor balcony")
-"""
+add_area(balcony_x, balcony_y, balcony_width, balcony_depth, "Balcony", "Outdoor balcony")
+""")
 
-        # Extrude walls
-        code += """
+_FLOOR_PLAN_FURNISH_TMPL = _body_template("""
 # Extrude walls
-walls_layer = "Walls"
-if not rs.IsLayer(walls_layer):
-    rs.AddLayer(walls_layer)
 rs.CurrentLayer(walls_layer)
 
+# Wall curves only live in memory; just the extruded walls go into the document
+wall_attrs = object_attributes("Wall", "Wall element", [200, 200, 200])
 for curve in wall_curves:
     # Create wall surface
-    swept_wall = rs.ExtrudeCurve(curve, rs.AddLine([0,0,0], [0,0,ceiling_height]))
+    swept_wall = Rhino.Geometry.Extrusion.Create(curve, ceiling_height, False)
     if swept_wall:
-        add_object_metadata(swept_wall, "Wall", "Wall element")
-        rs.ObjectColor(swept_wall, [200, 200, 200])
+        queued_geometry.append(swept_wall)
+        queued_attributes.append(wall_attrs)
 
 # Add room labels
-text_layer = "Labels"
-if not rs.IsLayer(text_layer):
-    rs.AddLayer(text_layer)
 rs.CurrentLayer(text_layer)
 
 # Add furniture (simplified blocks)
-furniture_layer = "Furniture"
-if not rs.IsLayer(furniture_layer):
-    rs.AddLayer(furniture_layer, [150, 120, 100])
 rs.CurrentLayer(furniture_layer)
 
-# Add some basic furniture depending on room type
-for room in room_coords:
-    room_center_x = room["x"] + room["width"]/2
-    room_center_y = room["y"] + room["depth"]/2
+# Furniture attributes (layer, color and metadata) are built once per kind
+sofa_attrs = object_attributes("Sofa", "Living room sofa", [180, 150, 120])
+table_attrs = object_attributes("CoffeeTable", "Living room coffee table", [150, 120, 90])
+bed_attrs = object_attributes("Bed", "Bed", [200, 190, 170])
+counter1_attrs = object_attributes("KitchenCounter1", "Kitchen counter", [180, 180, 180])
+counter2_attrs = object_attributes("KitchenCounter2", "Kitchen counter", [180, 180, 180])
+
+# Axis-aligned furniture block standing on the floor at (x, y)
+def furniture_box(x, y, box_width, box_depth, box_height):
+    return Rhino.Geometry.Box(
+        xy_plane(x, y),
+        Rhino.Geometry.Interval(0, box_width),
+        Rhino.Geometry.Interval(0, box_depth),
+        Rhino.Geometry.Interval(0, box_height)
+    )
+
+local_add_box = sc.doc.Objects.AddBox
+
+# Furniture for each room category
+def place_living(name, x, y, room_width, room_depth):
+    room_center_x = x + room_width/2
     
-    if room["name"] == "LivingRoom":
-        # Add sofa
-        sofa_width = min(room["width"] * 0.7, 3.0)
-        sofa_depth = 1.0
-        sofa_x = room_center_x - sofa_width/2
-        sofa_y = room["y"] + room["depth"] - sofa_depth - 0.5
-        
-        sofa = rs.AddBox(
-            rs.WorldXYPlane(),
-            sofa_width, sofa_depth, 0.8,
-            [sofa_x, sofa_y, 0]
-        )
-        add_object_metadata(sofa, "Sofa", "Living room sofa")
-        rs.ObjectColor(sofa, [180, 150, 120])
-        
-        # Add coffee table
-        table_size = 1.2
-        table_x = room_center_x - table_size/2
-        table_y = sofa_y - table_size - 0.3
-        
-        table = rs.AddBox(
-            rs.WorldXYPlane(),
-            table_size, table_size, 0.5,
-            [table_x, table_y, 0]
-        )
-        add_object_metadata(table, "CoffeeTable", "Living room coffee table")
-        rs.ObjectColor(table, [150, 120, 90])
-        
-    elif "Bedroom" in room["name"]:
-        # Add bed
-        bed_width = min(room["width"] * 0.8, 1.8)
-        bed_length = min(room["depth"] * 0.7, 2.2)
-        bed_x = room_center_x - bed_width/2
-        bed_y = room_center_y - bed_length/2
-        
-        bed = rs.AddBox(
-            rs.WorldXYPlane(),
-            bed_width, bed_length, 0.5,
-            [bed_x, bed_y, 0]
-        )
-        add_object_metadata(bed, "Bed_{0}".format(room["name"]), "Bed")
-        rs.ObjectColor(bed, [200, 190, 170])
-        
-    elif room["name"] == "Kitchen":
-        # Add kitchen counter along walls
-        counter_depth = 0.6
-        counter_height = 0.9
-        
-        # Counter along back wall
-        counter1 = rs.AddBox(
-            rs.WorldXYPlane(),
-            room["width"] - 1.0, counter_depth, counter_height,
-            [room["x"] + 0.5, room["y"] + room["depth"] - counter_depth, 0]
+    # Add sofa
+    sofa_width = min(room_width * 0.7, 3.0)
+    sofa_depth = 1.0
+    sofa_x = room_center_x - sofa_width/2
+    sofa_y = y + room_depth - sofa_depth - 0.5
+    local_add_box(furniture_box(sofa_x, sofa_y, sofa_width, sofa_depth, 0.8), sofa_attrs)
+    
+    # Add coffee table
+    table_size = 1.2
+    table_x = room_center_x - table_size/2
+    table_y = sofa_y - table_size - 0.3
+    local_add_box(furniture_box(table_x, table_y, table_size, table_size, 0.5), table_attrs)
+
+def place_bedroom(name, x, y, room_width, room_depth):
+    # Add bed
+    bed_width = min(room_width * 0.8, 1.8)
+    bed_length = min(room_depth * 0.7, 2.2)
+    bed_x = x + room_width/2 - bed_width/2
+    bed_y = y + room_depth/2 - bed_length/2
+    attrs = bed_attrs.Duplicate()
+    attrs.SetUserString("Name", "Bed_{0}".format(name))
+    local_add_box(furniture_box(bed_x, bed_y, bed_width, bed_length, 0.5), attrs)
+
+def place_kitchen(name, x, y, room_width, room_depth):
+    # Add kitchen counter along walls
+    counter_depth = 0.6
+    counter_height = 0.9
+    
+    # Counter along back wall
+    local_add_box(furniture_box(
+        x + 0.5, y + room_depth - counter_depth,
+        room_width - 1.0, counter_depth, counter_height
+    ), counter1_attrs)
+    
+    # Counter along side wall
+    local_add_box(furniture_box(
+        x, y + 0.5,
+        counter_depth, room_depth - counter_depth - 1.0, counter_height
+    ), counter2_attrs)
+
+furniture_placers = {
+    "living": place_living,
+    "bedroom": place_bedroom,
+    "kitchen": place_kitchen,
+}
+
+# Add some basic furniture depending on room category
+for category, name, x, y, room_width, room_depth in zip(
+        room_categories, room_labels, room_xs, room_ys, room_widths, room_depths):
+    place_furniture = furniture_placers.get(category)
+    if place_furniture:
+        place_furniture(name, x, y, room_width, room_depth)
+
+# Commit the queued plan geometry in one batch
+local_add_object = sc.doc.Objects.Add
+for geometry, attrs in zip(queued_geometry, queued_attributes):
+    local_add_object(geometry, attrs)
+""")
+
+_URBAN_GRID_TMPL = _body_template("""
+# Create urban design grid
+grid_size = {grid_size}  # Size of city blocks in meters
+grid_rows = {grid_rows}
+grid_columns = {grid_columns}
+road_width = {road_width}
+site_boundary = {site_boundary}  # Size of overall site boundary
+
+# Create site boundary
+site_rect = rs.AddRectangle(rs.WorldXYPlane(), site_boundary, site_boundary)
+site_srf = rs.AddPlanarSrf(site_rect)
+add_object_metadata(site_srf, "SiteBoundary", "Overall urban design site")
+
+# Add main roads
+urban_blocks = []
+for row in range(grid_rows):
+    for col in range(grid_columns):
+        # Calculate block position
+        x = col * (grid_size + road_width)
+        y = row * (grid_size + road_width)
+        
+        # Create block footprint
+        block_rect = rs.AddRectangle(xy_plane(x, y), grid_size, grid_size)
+        block_srf = rs.AddPlanarSrf(block_rect)
+        add_object_metadata(block_srf, "Block_{{0}}_{{1}}".format(row, col), "Urban block footprint")
+        
+        urban_blocks.append({{"id": block_srf, "row": row, "col": col, "x": x, "y": y}})
+""")
+
+_URBAN_BUILDINGS_TMPL = _body_template("""
+# Generate buildings on blocks
+max_height = {max_building_height}  # Maximum building height
+min_height = {min_building_height}  # Minimum building height
+density = {building_density}  # Building density (0-1)
+building_setback = {building_setback}  # Building setback from block edge
+height_distribution = {height_distribution}  # Height distribution factor
+
+# Create the building and road layers
+buildings_layer, roads_layer = ensure_layers([
+    ("Buildings", None),
+    ("Roads", [50, 50, 50]),
+])
+rs.CurrentLayer(buildings_layer)
+""")
+
+_URBAN_DRAWS_NUMPY_TMPL = _body_template("""
+# Draw the random numbers for all blocks up front; NumPy fills each batch in one call when available
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    rng = np.random.default_rng()
+    def rand(count):
+        return rng.random(count).tolist()
+else:
+    def rand(count):
+        local_random = random.random
+        return [local_random() for _ in range(count)]
+
+build_draws = rand(len(urban_blocks))
+height_jitter = rand(len(urban_blocks))
+""")
+
+_URBAN_DRAWS_PLAIN_TMPL = _body_template("""
+# Draw the random numbers for all blocks up front
+def rand(count):
+    local_random = random.random
+    return [local_random() for _ in range(count)]
+
+build_draws = rand(len(urban_blocks))
+height_jitter = rand(len(urban_blocks))
+""")
+
+_URBAN_BLOCK_HEIGHTS_TMPL = _body_template("""
+# Building height for every block (blocks are listed row by row): central blocks
+# are taller than edge blocks, with some random variation
+def block_heights(grid_rows, grid_columns, jitter, out, min_h, max_h, h_dist):
+    local_sqrt = math.sqrt
+    center_row = grid_rows / 2
+    center_col = grid_columns / 2
+    max_dist = local_sqrt(center_row**2 + center_col**2)
+    inv_max_dist = 1.0 / max_dist if max_dist > 0 else 0.0
+    h_range = max_h - min_h
+    k = 0
+    for row in range(grid_rows):
+        for col in range(grid_columns):
+            # Distance from center (0-1 normalized); height decreases with it
+            dist_from_center = local_sqrt((row - center_row)**2 + (col - center_col)**2)
+            norm_dist = dist_from_center * inv_max_dist
+            height_factor = 1 - (norm_dist * h_dist)
+            out[k] = (min_h + h_range * height_factor) * (0.8 + 0.4 * jitter[k])
+            k += 1
+    return out
+""")
+
+_URBAN_HEIGHTS_NUMBA_TMPL = _body_template("""
+# Compile the height kernel with Numba when it is available in this Rhino Python
+try:
+    from numba import njit
+    import numpy as np
+    heights = njit(fastmath=True)(block_heights)(
+        grid_rows, grid_columns, np.array(height_jitter), np.empty(len(urban_blocks)),
+        min_height, max_height, height_distribution
+    ).tolist()
+except ImportError:
+    heights = block_heights(grid_rows, grid_columns, height_jitter, [0.0] * len(urban_blocks),
+                            min_height, max_height, height_distribution)
+""")
+
+_URBAN_HEIGHTS_PLAIN_TMPL = _body_template("""
+heights = block_heights(grid_rows, grid_columns, height_jitter, [0.0] * len(urban_blocks),
+                        min_height, max_height, height_distribution)
+""")
+
+_URBAN_BUILDING_PLACEMENT_TMPL = _body_template("""
+# Values shared by every building
+footprint_size = grid_size - 2 * building_setback
+height_range = max_height - min_height
+
+# Buildings are axis-aligned boxes, so each one is a light box mesh added with
+# one document call; the attribute prototype carries the layer and timestamp
+building_attrs = Rhino.DocObjects.ObjectAttributes()
+building_attrs.LayerIndex = sc.doc.Layers.CurrentLayerIndex
+building_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+building_attrs.SetUserString("CreatedAt", str(System.DateTime.Now))
+
+# Building ids by (row, col), so later passes can find a block's building directly
+buildings_by_block = {}
+
+for k, block in enumerate(urban_blocks):
+    # Determine if this block gets a building based on density
+    if build_draws[k] < density:
+        # Building footprint with setback
+        x = block["x"] + building_setback
+        y = block["y"] + building_setback
+        
+        # Building height from the precomputed height field
+        height = heights[k]
+        
+        # Box mesh for the building volume
+        building_box = Rhino.Geometry.BoundingBox(x, y, 0, x + footprint_size, y + footprint_size, height)
+        building_mesh = Rhino.Geometry.Mesh.CreateFromBox(building_box, 1, 1, 1)
+        
+        # Color buildings based on height
+        color_factor = (height - min_height) / height_range if height_range > 0 else 0.5
+        attrs = building_attrs.Duplicate()
+        attrs.ObjectColor = System.Drawing.Color.FromArgb(
+            int(120 + 135 * color_factor), int(120 + 80 * (1-color_factor)), int(140 + 40 * color_factor)
         )
-        add_object_metadata(counter1, "KitchenCounter1", "Kitchen counter")
-        rs.ObjectColor(counter1, [180, 180, 180])
-        
-        # Counter along side wall
-        counter2 = rs.AddBox(
-            rs.WorldXYPlane(),
-            counter_depth, room["depth"] - counter_depth - 1.0, counter_height,
-            [room["x"], room["y"] + 0.5, 0]
+        attrs.SetUserString("Name", "Building_{0}_{1}".format(block["row"], block["col"]))
+        attrs.SetUserString("Description", "Urban building, height: {0}m".format(round(height, 1)))
+        
+        building = sc.doc.Objects.AddMesh(building_mesh, attrs)
+        buildings_by_block[(block["row"], block["col"])] = building
+""")
+
+_URBAN_GREEN_TMPL = _body_template("""
+# Add parks and green spaces
+green_layer = ensure_layer("GreenSpaces", [0, 180, 0])
+rs.CurrentLayer(green_layer)
+
+# Trees are instances of one "Tree" block definition: an average-sized trunk and
+# canopy at the origin, built once; every tree only adds a transform
+tree_def = sc.doc.InstanceDefinitions.Find("Tree")
+if tree_def:
+    tree_def_index = tree_def.Index
+else:
+    trunk_brep = Rhino.Geometry.Cylinder(Rhino.Geometry.Circle(Rhino.Geometry.Plane.WorldXY, 0.35), 4.0).ToBrep(True, True)
+    canopy_brep = Rhino.Geometry.Sphere(Rhino.Geometry.Point3d(0, 0, 6.5), 2.5).ToBrep()
+    trunk_attrs = Rhino.DocObjects.ObjectAttributes()
+    trunk_attrs.LayerIndex = sc.doc.Layers.CurrentLayerIndex
+    trunk_attrs.ObjectColor = System.Drawing.Color.FromArgb(120, 80, 40)
+    trunk_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+    # The canopy takes its shade from each tree instance
+    canopy_attrs = Rhino.DocObjects.ObjectAttributes()
+    canopy_attrs.LayerIndex = sc.doc.Layers.CurrentLayerIndex
+    canopy_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromParent
+    tree_def_index = sc.doc.InstanceDefinitions.Add(
+        "Tree", "Park tree", Rhino.Geometry.Point3d.Origin,
+        [trunk_brep, canopy_brep], [trunk_attrs, canopy_attrs]
+    )
+
+# Attribute prototype for tree instances
+tree_attrs = Rhino.DocObjects.ObjectAttributes()
+tree_attrs.LayerIndex = sc.doc.Layers.CurrentLayerIndex
+tree_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+tree_attrs.SetUserString("Description", "Tree in central park")
+tree_attrs.SetUserString("CreatedAt", str(System.DateTime.Now))
+
+# Create a central park
+central_row = int(grid_rows / 2)
+central_col = int(grid_columns / 2)
+
+# Find blocks to convert to parks
+for block in urban_blocks:
+    # Central park
+    if block["row"] == central_row and block["col"] == central_col:
+        # Delete any building on this block
+        building_obj = buildings_by_block.pop((block["row"], block["col"]), None)
+        if building_obj:
+            rs.DeleteObject(building_obj)
+            
+        # Create park surface
+        park_surface = rs.CopyObject(block["id"])
+        rs.ObjectColor(park_surface, [0, 180, 0])
+        
+        # Add some trees to the park
+        tree_count = 20
+        # The park is the block footprint, so its bounds are known without a BoundingBox query
+        min_pt = [block["x"], block["y"], 0]
+        max_pt = [block["x"] + grid_size, block["y"] + grid_size, 0]
+        
+        # Random positions, sizes and shades for all trees
+        tree_xs, tree_ys = rand(tree_count), rand(tree_count)
+        tree_sizes = rand(tree_count)
+        canopy_shades = rand(tree_count)
+        
+        for i in range(tree_count):
+            # Random position within park
+            tree_x = min_pt[0] + tree_xs[i] * (max_pt[0] - min_pt[0])
+            tree_y = min_pt[1] + tree_ys[i] * (max_pt[1] - min_pt[1])
+            
+            # Place a tree instance, scaled around its base
+            tree_xform = (Rhino.Geometry.Transform.Translation(tree_x, tree_y, 0)
+                          * Rhino.Geometry.Transform.Scale(Rhino.Geometry.Point3d.Origin, 0.8 + tree_sizes[i] * 0.4))
+            attrs = tree_attrs.Duplicate()
+            attrs.ObjectColor = System.Drawing.Color.FromArgb(0, 150 + int(canopy_shades[i] * 51), 0)
+            attrs.SetUserString("Name", "Tree_{0}".format(i))
+            sc.doc.Objects.AddInstanceObject(tree_def_index, tree_xform, attrs)
+""")
+
+_URBAN_ROADS_TMPL = _body_template("""
+# Add main roads network
+rs.CurrentLayer(roads_layer)
+
+road_width = {road_width}
+grid_size_with_road = grid_size + road_width
+
+# Road strips are planar surfaces built directly from a plane and two extents,
+# added with one document call each; only the plane origin changes per road
+road_attrs = Rhino.DocObjects.ObjectAttributes()
+road_attrs.LayerIndex = sc.doc.Layers.CurrentLayerIndex
+road_attrs.ObjectColor = System.Drawing.Color.FromArgb(50, 50, 50)
+road_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+road_attrs.SetUserString("CreatedAt", str(System.DateTime.Now))
+
+def add_road(x, y, road_length_x, road_length_y, name, description):
+    road_srf = Rhino.Geometry.PlaneSurface(
+        xy_plane(x, y, 0.1),  # Slightly above ground
+        Rhino.Geometry.Interval(0, road_length_x), Rhino.Geometry.Interval(0, road_length_y)
+    )
+    attrs = road_attrs.Duplicate()
+    attrs.SetUserString("Name", name)
+    attrs.SetUserString("Description", description)
+    return sc.doc.Objects.AddSurface(road_srf, attrs)
+
+# Create horizontal roads
+road_length = grid_columns * grid_size_with_road
+for row in range(grid_rows + 1):
+    road_y = row * grid_size_with_road - road_width/2
+    add_road(0, road_y, road_length, road_width, "Road_H_{{0}}".format(row), "Horizontal road")
+
+# Create vertical roads
+road_length = grid_rows * grid_size_with_road
+for col in range(grid_columns + 1):
+    road_x = col * grid_size_with_road - road_width/2
+    add_road(road_x, 0, road_width, road_length, "Road_V_{{0}}".format(col), "Vertical road")
+""")
+
+_LANDSCAPE_PLACEHOLDER_TMPL = _body_template("""
+# Placeholder for landscape generation code
+print("Landscape generation would happen here")
+""")
+
+_STRUCTURE_LAYERS_TMPL = _body_template("""
+# Create a layer for structural elements with sub-layers for the different elements
+struct_layer, columns_layer, beams_layer, slabs_layer, bracing_layer, grid_lines_layer = ensure_layers([
+    ("Structural", None),
+    ("Structural::Columns", None),
+    ("Structural::Beams", None),
+    ("Structural::Slabs", None),
+    ("Structural::Bracing", None),
+    ("Structural::GridLines", [150, 150, 150]),
+])
+
+# Material colors, built once as System colors
+material_rgb = {material_rgb}  # {material}
+material_color = System.Drawing.Color.FromArgb(*material_rgb)
+
+# Slabs are slightly lighter than the structural members
+slab_color = System.Drawing.Color.FromArgb(*[min(c + 20, 255) for c in material_rgb])
+""")
+
+_STRUCTURE_GRID_TMPL = _body_template("""
+# Create structural grid
+grid_size = {grid_size}  # Grid spacing in meters
+grid_x = {grid_x}     # Number of grid lines in X direction
+grid_y = {grid_y}     # Number of grid lines in Y direction
+num_floors = {num_floors} # Number of floors
+floor_height = {floor_height} # Height per floor
+
+# Grid coordinates along X and Y and the level of every floor, computed once
+xs = [i * grid_size for i in range(grid_x)]
+ys = [j * grid_size for j in range(grid_y)]
+zs = [floor * floor_height for floor in range(num_floors + 1)]
+grid_extent_x = (grid_x - 1) * grid_size
+grid_extent_y = (grid_y - 1) * grid_size
+""")
+
+_STRUCTURE_GRID_POINTS_NUMPY_TMPL = _body_template("""
+# Create grid points; NumPy builds the whole grid in one call when available
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    grid_xx, grid_yy = np.meshgrid(np.array(xs), np.array(ys), indexing="ij")
+    grid_points = np.stack([grid_xx.ravel(), grid_yy.ravel(), np.zeros(grid_xx.size)], axis=1).tolist()
+else:
+    grid_points = [[x, y, 0] for x in xs for y in ys]
+""")
+
+_STRUCTURE_GRID_POINTS_PLAIN_TMPL = _body_template("""
+# Create grid points
+grid_points = [[x, y, 0] for x in xs for y in ys]
+""")
+
+_STRUCTURE_GRID_LINES_TMPL = _body_template("""
+# Create grid lines to visualize the grid (optional)
+rs.CurrentLayer(grid_lines_layer)
+
+# Horizontal grid lines (X direction)
+for j, y in enumerate(ys):
+    start_point = [0, y, 0]
+    end_point = [grid_extent_x, y, 0]
+    grid_line = rs.AddLine(start_point, end_point)
+    rs.ObjectColor(grid_line, [150, 150, 150])
+    add_object_metadata(grid_line, "GridLine_X_{{0}}".format(j), "Structural grid line in X direction")
+
+# Vertical grid lines (Y direction)
+for i, x in enumerate(xs):
+    start_point = [x, 0, 0]
+    end_point = [x, grid_extent_y, 0]
+    grid_line = rs.AddLine(start_point, end_point)
+    rs.ObjectColor(grid_line, [150, 150, 150])
+    add_object_metadata(grid_line, "GridLine_Y_{{0}}".format(i), "Structural grid line in Y direction")
+""")
+
+_STRUCTURE_COLUMNS_TMPL = _body_template("""
+# Create columns
+rs.CurrentLayer(columns_layer)
+column_width = {column_width}
+column_depth = {column_depth}
+columns = []
+
+# Build every column as geometry first (steel I/H sections are simplified as rectangular boxes)
+column_breps = []
+for pt in grid_points:
+    for floor in range(num_floors + 1):  # +1 for ground floor
+        # Column base plane at this floor
+        base_plane = Rhino.Geometry.Plane(Rhino.Geometry.Point3d(pt[0], pt[1], zs[floor]), Rhino.Geometry.Vector3d.ZAxis)
+        column_box = Rhino.Geometry.Box(
+            base_plane,
+            Rhino.Geometry.Interval(0, column_width),
+            Rhino.Geometry.Interval(0, column_depth),
+            Rhino.Geometry.Interval(0, floor_height)
         )
-        add_object_metadata(counter2, "KitchenCounter2", "Kitchen counter")
-        rs.ObjectColor(counter2, [180, 180, 180])
+        column_breps.append((column_box.ToBrep(), pt, floor))
+
+# One attribute prototype carries the layer, color and shared metadata of all columns
+column_attrs = Rhino.DocObjects.ObjectAttributes()
+column_attrs.LayerIndex = sc.doc.Layers.FindByFullPath(columns_layer, -1)
+column_attrs.ObjectColor = material_color
+column_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+column_attrs.SetUserString("CreatedAt", str(System.DateTime.Now))
+
+local_add_brep = sc.doc.Objects.AddBrep
+for brep, pt, floor in column_breps:
+    grid_i, grid_j = int(pt[0]/grid_size), int(pt[1]/grid_size)
+    attrs = column_attrs.Duplicate()
+    attrs.SetUserString("Name", "Column_X{{0}}_Y{{1}}_F{{2}}".format(grid_i, grid_j, floor))
+    attrs.SetUserString("Description", "Structural column at grid ({{0}}, {{1}}), floor {{2}}".format(grid_i, grid_j, floor))
+    column = local_add_brep(brep, attrs)
+    columns.append({{"id": column, "x": pt[0], "y": pt[1], "floor": floor}})
+""")
+
+_STRUCTURE_BEAMS_TMPL = _body_template("""
+# Create beams
+rs.CurrentLayer(beams_layer)
+beam_depth = {beam_depth}
+beam_width = {beam_width}
+
+# One attribute prototype carries the layer, color and shared metadata of all beams
+beam_attrs = Rhino.DocObjects.ObjectAttributes()
+beam_attrs.LayerIndex = sc.doc.Layers.FindByFullPath(beams_layer, -1)
+beam_attrs.ObjectColor = material_color
+beam_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+beam_attrs.SetUserString("CreatedAt", str(System.DateTime.Now))
+local_add_box = sc.doc.Objects.AddBox
+
+# Function to create a beam between two points; beams run along X or Y, so each
+# one is a single box centered on its axis line
+def create_beam(start_pt, end_pt, floor, beam_index):
+    beam_dir = Rhino.Geometry.Vector3d(end_pt[0] - start_pt[0], end_pt[1] - start_pt[1], end_pt[2] - start_pt[2])
+    beam_length = beam_dir.Length
+    beam_dir.Unitize()
+    beam_plane = Rhino.Geometry.Plane(
+        Rhino.Geometry.Point3d(start_pt[0], start_pt[1], start_pt[2] - beam_depth/2),
+        beam_dir,
+        Rhino.Geometry.Vector3d.CrossProduct(Rhino.Geometry.Vector3d.ZAxis, beam_dir)
+    )
+    beam_box = Rhino.Geometry.Box(
+        beam_plane,
+        Rhino.Geometry.Interval(0, beam_length),
+        Rhino.Geometry.Interval(-beam_width/2, beam_width/2),
+        Rhino.Geometry.Interval(0, beam_depth)
+    )
+    
+    attrs = beam_attrs.Duplicate()
+    attrs.SetUserString("Name", "Beam_{{0}}_Floor{{1}}".format(beam_index, floor))
+    attrs.SetUserString("Description", "Structural beam at floor {{0}}".format(floor))
+    return local_add_box(beam_box, attrs)
+""")
+
+_STRUCTURE_BEAM_ENDS_NUMPY_TMPL = _body_template("""
+# Beam endpoints for every floor (from the 1st floor up): X-direction beams
+# first, then Y-direction beams, in the order the beams are numbered
+if np is not None:
+    floor_numbers = np.arange(1, num_floors + 1)
+    jj, ii, x_floors = np.meshgrid(np.arange(grid_y), np.arange(grid_x - 1), floor_numbers, indexing="ij")
+    x_starts = np.stack([ii.ravel() * grid_size, jj.ravel() * grid_size, x_floors.ravel() * floor_height], axis=1)
+    ii, jj, y_floors = np.meshgrid(np.arange(grid_x), np.arange(grid_y - 1), floor_numbers, indexing="ij")
+    y_starts = np.stack([ii.ravel() * grid_size, jj.ravel() * grid_size, y_floors.ravel() * floor_height], axis=1)
+    beam_starts = np.concatenate([x_starts, y_starts]).tolist()
+    beam_ends = np.concatenate([x_starts + [grid_size, 0, 0], y_starts + [0, grid_size, 0]]).tolist()
+    beam_floors = np.concatenate([x_floors.ravel(), y_floors.ravel()]).tolist()
+else:
+    x_keys = [(i, j, floor) for j in range(grid_y) for i in range(grid_x - 1) for floor in range(1, num_floors + 1)]
+    y_keys = [(i, j, floor) for i in range(grid_x) for j in range(grid_y - 1) for floor in range(1, num_floors + 1)]
+    beam_starts = [[xs[i], ys[j], zs[floor]] for i, j, floor in x_keys + y_keys]
+    beam_ends = ([[xs[i + 1], ys[j], zs[floor]] for i, j, floor in x_keys]
+                 + [[xs[i], ys[j + 1], zs[floor]] for i, j, floor in y_keys])
+    beam_floors = [floor for i, j, floor in x_keys + y_keys]
+""")
+
+_STRUCTURE_BEAM_ENDS_PLAIN_TMPL = _body_template("""
+# Beam endpoints for every floor (from the 1st floor up): X-direction beams
+# first, then Y-direction beams, in the order the beams are numbered
+x_keys = [(i, j, floor) for j in range(grid_y) for i in range(grid_x - 1) for floor in range(1, num_floors + 1)]
+y_keys = [(i, j, floor) for i in range(grid_x) for j in range(grid_y - 1) for floor in range(1, num_floors + 1)]
+beam_starts = [[xs[i], ys[j], zs[floor]] for i, j, floor in x_keys + y_keys]
+beam_ends = ([[xs[i + 1], ys[j], zs[floor]] for i, j, floor in x_keys]
+             + [[xs[i], ys[j + 1], zs[floor]] for i, j, floor in y_keys])
+beam_floors = [floor for i, j, floor in x_keys + y_keys]
+""")
+
+_STRUCTURE_BEAMS_ADD_TMPL = _body_template("""
+# Create beams
+for beam_index, (start_pt, end_pt, floor) in enumerate(zip(beam_starts, beam_ends, beam_floors)):
+    beam = create_beam(start_pt, end_pt, floor, beam_index)
+""")
+
+_STRUCTURE_SLABS_TMPL = _body_template("""
+# Create floor slabs
+rs.CurrentLayer(slabs_layer)
+slab_thickness = {thickness}
+
+# Every slab spans the whole grid; only its level changes from floor to floor
+slab_width = (grid_x - 1) * grid_size
+slab_length = (grid_y - 1) * grid_size
+
+# One attribute prototype carries the layer, color and shared metadata of all slabs
+slab_attrs = Rhino.DocObjects.ObjectAttributes()
+slab_attrs.LayerIndex = sc.doc.Layers.FindByFullPath(slabs_layer, -1)
+slab_attrs.ObjectColor = slab_color
+slab_attrs.ColorSource = Rhino.DocObjects.ObjectColorSource.ColorFromObject
+slab_attrs.SetUserString("CreatedAt", str(System.DateTime.Now))
+
+for floor in range(1, num_floors + 1):  # Start from 1st floor
+    # Create slab as a box whose top is at the floor level
+    slab_box = Rhino.Geometry.Box(
+        xy_plane(0, 0, floor * floor_height - slab_thickness),
+        Rhino.Geometry.Interval(0, slab_width),
+        Rhino.Geometry.Interval(0, slab_length),
+        Rhino.Geometry.Interval(0, slab_thickness)
+    )
+    
+    attrs = slab_attrs.Duplicate()
+    attrs.SetUserString("Name", "FloorSlab_{{0}}".format(floor))
+    attrs.SetUserString("Description", "Floor slab at level {{0}}".format(floor))
+    slab = local_add_box(slab_box, attrs)
+""")
+
+_STRUCTURE_BRACING_LAYER = _body_template("""
+# Create lateral system (bracing)
+rs.CurrentLayer(bracing_layer)
+""")
+
+_STRUCTURE_BRACES_TMPL = _body_template("""
+# Add diagonal bracing on perimeter
+bracing_width = 0.15  # Width of bracing elements
+brace_rgb = {brace_rgb}
+brace_color = System.Drawing.Color.FromArgb(*brace_rgb)
+
+# Function to create a diagonal brace
+def create_brace(start_pt, end_pt, brace_index):
+    # Create brace centerline
+    brace_line = rs.AddLine(start_pt, end_pt)
+    
+    # Create a circular profile
+    profile = rs.AddCircle(xy_plane(*start_pt), bracing_width/2)
+    
+    # Extrude along path
+    brace = rs.ExtrudeCurve(profile, brace_line)
+    
+    # Clean up
+    rs.DeleteObjects([profile, brace_line])
+    
+    # Style the brace
+    rs.ObjectColor(brace, brace_color)
+    add_object_metadata(
+        brace,
+        "Brace_{{0}}".format(brace_index),
+        "Lateral bracing element"
+    )
+    return brace
+
+# X-bracing on every perimeter bay and floor (front, back, left and right faces),
+# one start and end point row per brace
+brace_data = [{brace_rows}
+]
+for brace_index, row in enumerate(brace_data):
+    brace = create_brace(row[:3], row[3:], brace_index)
+""")
+
+# The brace table is written straight into the script between these two parts
+# rather than formatted into an intermediate copy of the template
+_STRUCTURE_BRACES_PRE, _STRUCTURE_BRACES_POST = _STRUCTURE_BRACES_TMPL.split("{brace_rows}")
+
+_PARAMETRIC_FORM_PLACEHOLDER_TMPL = _body_template("""
+# Placeholder for parametric form generation code
+print("Parametric form generation would happen here")
+""")
+
+# Grasshopper component code: common header, then the domain body
+_GRASSHOPPER_HEADER_TMPL = """
+import Rhino.Geometry as rg
+import scriptcontext as sc
+import Grasshopper.Kernel.Data.GH_Path as GH_Path
+import Grasshopper.DataTree as DataTree
+import System
+import math
+import random
+
+# This is a parametric {0} design generator
+# Input parameters (can be connected to Grasshopper sliders/components)
 """
 
-        return code
+# Rest of GH code would be similar to Rhino code but adapted for Grasshopper
+# Placeholder for demo
+_GRASSHOPPER_BODY_TMPL = """
+# Placeholder for Grasshopper code generation
+# Would be specific to the {0} design domain
+
+# Set outputs
+output = "{0} design generation would happen in Grasshopper"
+"""
+
+# Static pieces of the Grasshopper code between design domain placeholders
+_GRASSHOPPER_PARTS = (_GRASSHOPPER_HEADER_TMPL + _GRASSHOPPER_BODY_TMPL).split("{0}")
+
+
+class DesignBriefInterpreter:
+    """
+    Interprets natural language design briefs and converts them into 
+    structured parametric operations for Rhino and Grasshopper.
+    """
     
-    def _generate_urban_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
-        """Generate Rhino code for urban design operations."""
-        code = ""
+    # Design parameters and their default values (read-only, copied per brief)
+    DEFAULT_PARAMS = MappingProxyType({
+        "grid_size": 1.0,            # Base grid size in meters
+        "floor_height": 3.0,          # Default floor height in meters
+        "panel_depth": 0.2,           # Default panel depth in meters
+        "facade_offset": 0.5,         # Offset from building envelope in meters
+        "story_count": 5,             # Default number of stories
+        "responsive_panels": True,    # Whether panels respond to environment
+        "panel_density": 0.8,         # Density of panels (0.0-1.0)
+        "view_priority": 0.7,         # Priority for views (0.0-1.0)
+        "sun_priority": 0.8,          # Priority for sun angle response (0.0-1.0)
+        "panel_rotation_limit": 45,   # Maximum panel rotation in degrees
+        "panel_type": "rectangular",  # Default panel geometry
+        "material": "glass",          # Default material
+        "structural_system": "frame", # Default structural system
+        "color_scheme": "default",    # Default color scheme for the design
+    })
+    
+    # Common design brief keywords and their parameter mappings (read-only)
+    KEYWORD_MAPPINGS = MappingProxyType({
+        # Building scale and form
+        "high-rise": {"story_count": 30, "panel_density": 0.9},
+        "mid-rise": {"story_count": 15, "panel_density": 0.8},
+        "low-rise": {"story_count": 5, "panel_density": 0.7},
+        "tower": {"story_count": 40, "panel_density": 0.85, "form": "tower"},
+        
+        # Panel types and systems
+        "dynamic": {"responsive_panels": True, "panel_rotation_limit": 60},
+        "static": {"responsive_panels": False, "panel_rotation_limit": 0},
+        "kinetic": {"responsive_panels": True, "panel_rotation_limit": 90},
+        "adaptive": {"responsive_panels": True, "panel_rotation_limit": 75},
+        "responsive": {"responsive_panels": True},
+        "louvres": {"panel_type": "louvre", "panel_density": 0.9},
+        "sunshade": {"panel_type": "louvre", "sun_priority": 0.9, "view_priority": 0.5},
+        
+        # Environmental responses
+        "sun angle": {"sun_priority": 0.9},
+        "solar": {"sun_priority": 0.9},
+        "daylight": {"sun_priority": 0.8, "panel_type": "perforated"},
+        "shadowing": {"sun_priority": 0.9, "panel_density": 0.9},
+        
+        # View and aesthetic elements
+        "views": {"view_priority": 0.9},
+        "framing views": {"view_priority": 0.95, "panel_density": 0.7},
+        "transparent": {"material": "glass", "panel_density": 0.6},
+        "opaque": {"material": "solid", "panel_density": 0.9},
+        
+        # Materials
+        "glass": {"material": "glass"},
+        "metal": {"material": "metal"},
+        "wood": {"material": "wood"},
+        "aluminum": {"material": "aluminum"},
+        "concrete": {"material": "concrete"},
+        
+        # Patterns and density
+        "dense": {"panel_density": 0.9},
+        "sparse": {"panel_density": 0.5},
+        "porous": {"panel_density": 0.6, "panel_type": "perforated"},
+        "pattern": {"panel_type": "patterned"},
+        "parametric": {"panel_type": "parametric"},
+        
+        # Structural considerations
+        "lightweight": {"structural_system": "lightweight"},
+        "modular": {"grid_size": 1.2, "structural_system": "modular"},
+        "prefab": {"structural_system": "modular"},
+    })
+    
+    def __init__(self):
+        # Generated Rhino code keyed by a digest of the operations (LRU order)
+        self._rhino_code_cache = OrderedDict()
+        
+        # Serialized responses keyed by the brief and code targets (LRU order);
+        # failed interpretations are never cached
+        self._brief_cache = OrderedDict()
+        
+        # Design domain -> operation generator
+        self._operations_dispatch = {
+            "facade": self._generate_facade_operations,
+            "floor_plan": self._generate_floor_plan_operations,
+            "urban": self._generate_urban_operations,
+            "landscape": self._generate_landscape_operations,
+            "structure": self._generate_structure_operations,
+            "parametric_form": self._generate_parametric_form_operations,
+        }
+        
+        # Design domain (including aliases) -> Rhino code generator
+        self._rhino_code_dispatch = {
+            "facade": self._generate_facade_rhino_code,
+            "floor_plan": self._generate_floor_plan_rhino_code,
+            "floor layout": self._generate_floor_plan_rhino_code,
+            "urban": self._generate_urban_rhino_code,
+            "urban design": self._generate_urban_rhino_code,
+            "landscape": self._generate_landscape_rhino_code,
+            "landscape design": self._generate_landscape_rhino_code,
+            "structure": self._generate_structure_rhino_code,
+            "structural": self._generate_structure_rhino_code,
+            "parametric_form": self._generate_parametric_form_rhino_code,
+            "form": self._generate_parametric_form_rhino_code,
+        }
+        
+        # Code target -> code generator for a list of operations
+        self._code_dispatch = {
+            "rhino": self._generate_rhino_code,
+            "grasshopper": self._generate_grasshopper_code,
+        }
+    
+    # Keyword tables are built on first use, so instances that only generate
+    # code from ready-made operations never pay for them
+    
+    @cached_property
+    def patterns(self) -> Dict[str, str]:
+        """Brief analysis regex patterns."""
+        return {
+            "building_type": r"(high-rise|mid-rise|low-rise|tower|building)",
+            "facade_type": r"(dynamic|kinetic|adaptive|responsive|static|louvres|sunshade)",
+            "environment": r"(sun angle|solar|daylight|shadowing|climate|weather|temperature)",
+            "views": r"(views|framing views|panorama|outlook|vista)",
+            "materials": r"(glass|metal|wood|aluminum|concrete|transparent|opaque)",
+            "pattern": r"(dense|sparse|porous|pattern|parametric)",
+            "structure": r"(lightweight|modular|prefab)",
+        }
+    
+    @cached_property
+    def _keyword_re(self) -> "re.Pattern":
+        """Single alternation with one named group per category, so the brief
+        is scanned once instead of once per category."""
+        return re.compile("|".join(
+            "(?P<{0}>{1})".format(category, pattern[1:-1])
+            for category, pattern in self.patterns.items()
+        ))
+    
+    @cached_property
+    def _keyword_params(self) -> Dict[str, Dict[str, Any]]:
+        """Parameter mapping for every matchable keyword (empty when it only tags a category)."""
+        return {
+            word: self.KEYWORD_MAPPINGS.get(word, {})
+            for pattern in self.patterns.values()
+            for word in pattern[1:-1].split("|")
+        }
+    
+    @cached_property
+    def _automaton(self):
+        """Aho-Corasick automaton over the literal keywords when pyahocorasick is installed, else None."""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for category, pattern in self.patterns.items():
+            for word in pattern[1:-1].split("|"):
+                automaton.add_word(word, (category, word))
+        automaton.make_automaton()
+        return automaton
+    
+    def _match_keywords(self, brief: str) -> List[Tuple[str, str, Tuple[int, int]]]:
+        """
+        Tokenize the brief in a single pass.
+        
+        Returns (category, keyword, span) tokens ordered by position in the brief.
+        """
+        brief_lower = brief.lower()
+        
+        if self._automaton is not None:
+            # iter_long yields leftmost-longest, non-overlapping hits like the regex
+            return [
+                (category, word, (end - len(word) + 1, end + 1))
+                for end, (category, word) in self._automaton.iter_long(brief_lower)
+            ]
+        
+        return [
+            (match.lastgroup, match.group(), match.span())
+            for match in self._keyword_re.finditer(brief_lower)
+        ]
+    
+    def _extract_keywords(self, tokens: List[Tuple[str, str, Tuple[int, int]]]) -> Dict[str, List[str]]:
+        """Group matched keywords by category for reporting."""
+        results = {}
+        
+        # Bucket each hit by its category
+        for category, word, _ in tokens:
+            results.setdefault(category, []).append(word)
+        
+        return results
+    
+    def _derive_parameters(self, tokens: List[Tuple[str, str, Tuple[int, int]]]) -> Dict[str, Any]:
+        """Derive design parameters from matched keywords."""
+        # Start with default parameters
+        params = dict(self.DEFAULT_PARAMS)
+        
+        # Tokens are in brief order, so when keywords conflict the last occurrence wins
+        keyword_params = self._keyword_params
+        for _, word, _ in tokens:
+            params.update(keyword_params[word])
+        
+        return params
+    
+    def _generate_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate a sequence of parametric operations based on the parameters and design domain."""
+        operations = []
+        
+        # Determine which design domain to use
+        design_domain = params.get("design_domain", "facade")
+        
+        # Common initial operations for all domains
+        operations.append({
+            "operation": "initialize_design",
+            "params": {
+                "design_domain": design_domain,
+                "grid_size": params["grid_size"],
+                "material": params["material"],
+                "color_scheme": params["color_scheme"]
+            }
+        })
+        
+        # Domain-specific operations
+        generate = self._operations_dispatch.get(design_domain)
+        if generate:
+            operations.extend(generate(params))
+        
+        # Final operation for all domains
+        operations.append({
+            "operation": "finalize_design",
+            "params": {
+                "design_domain": design_domain,
+                "export_format": "3dm",
+                "add_metadata": True
+            }
+        })
+        
+        return operations
+    
+    def _generate_facade_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate operations specific to facade design."""
+        operations = []
+        
+        # Define the building envelope
+        operations.append({
+            "operation": "create_building_envelope",
+            "params": {
+                "story_count": params["story_count"],
+                "floor_height": params["floor_height"],
+                "grid_size": params["grid_size"]
+            }
+        })
+        
+        # Create the facade system
+        operations.append({
+            "operation": "create_facade_system",
+            "params": {
+                "offset": params["facade_offset"],
+                "panel_type": params["panel_type"],
+                "panel_density": params["panel_density"],
+                "material": params["material"],
+                "structural_system": params["structural_system"]
+            }
+        })
+        
+        # If responsive, add environmental analysis
+        if params["responsive_panels"]:
+            operations.append({
+                "operation": "analyze_sun_angles",
+                "params": {
+                    "priority": params["sun_priority"]
+                }
+            })
+            
+            operations.append({
+                "operation": "analyze_view_corridors",
+                "params": {
+                    "priority": params["view_priority"]
+                }
+            })
+            
+            operations.append({
+                "operation": "generate_panel_rotations",
+                "params": {
+                    "rotation_limit": params["panel_rotation_limit"],
+                    "sun_priority": params["sun_priority"],
+                    "view_priority": params["view_priority"]
+                }
+            })
+        
+        # Generate the facade geometry
+        operations.append({
+            "operation": "generate_facade_geometry",
+            "params": params
+        })
+        
+        return operations
+    
+    def _generate_floor_plan_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate operations specific to floor plan design."""
+        operations = []
+        
+        # Create the floor boundary
+        operations.append({
+            "operation": "create_floor_boundary",
+            "params": {
+                "area": params["floor_area"],
+                "proportions": "rectangular"
+            }
+        })
+        
+        # Generate program zones
+        operations.append({
+            "operation": "generate_program_zones",
+            "params": {
+                "program_type": params["program_type"],
+                "room_count": params["room_count"],
+                "open_plan": params["open_plan"]
+            }
+        })
+        
+        # Create circulation
+        operations.append({
+            "operation": "create_circulation",
+            "params": {
+                "corridor_width": params["corridor_width"],
+                "room_division": params["room_division"]
+            }
+        })
+        
+        # Create interior partitions
+        if not params["open_plan"]:
+            operations.append({
+                "operation": "create_partitions",
+                "params": {
+                    "room_division": params["room_division"],
+                    "room_count": params["room_count"]
+                }
+            })
+        
+        # Place furniture and fixtures
+        operations.append({
+            "operation": "place_furniture",
+            "params": {
+                "program_type": params["program_type"],
+                "density": 0.7
+            }
+        })
+        
+        return operations
+    
+    def _generate_urban_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate operations specific to urban design."""
+        operations = []
+        
+        # Create site boundary
+        operations.append({
+            "operation": "create_site_boundary",
+            "params": {
+                "site_area": params["block_size"] * params["block_size"] * 4,
+                "site_proportions": "rectangular"
+            }
+        })
+        
+        # Generate street network
+        operations.append({
+            "operation": "generate_street_network",
+            "params": {
+                "block_size": params["block_size"],
+                "street_width": params["street_width"],
+                "network_type": "grid"
+            }
+        })
+        
+        # Create building footprints
+        operations.append({
+            "operation": "create_building_footprints",
+            "params": {
+                "coverage": params["building_coverage"],
+                "density": params["density"]
+            }
+        })
+        
+        # Generate building massing
+        operations.append({
+            "operation": "generate_building_massing",
+            "params": {
+                "height_avg": params["building_height_avg"],
+                "height_variation": 0.3,
+                "mixed_use": params["mixed_use"]
+            }
+        })
+        
+        # Add public spaces
+        operations.append({
+            "operation": "add_public_spaces",
+            "params": {
+                "ratio": 0.2,
+                "distribution": "central"
+            }
+        })
+        
+        return operations
+    
+    def _generate_landscape_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate operations specific to landscape design."""
+        operations = []
+        
+        # Create site terrain
+        operations.append({
+            "operation": "create_terrain",
+            "params": {
+                "area": 10000,
+                "complexity": params["terrain_complexity"],
+                "height_variation": params["topography_variation"]
+            }
+        })
+        
+        # Generate path network
+        operations.append({
+            "operation": "generate_path_network",
+            "params": {
+                "complexity": params["path_complexity"],
+                "path_width": 2.0
+            }
+        })
+        
+        # Add vegetation
+        operations.append({
+            "operation": "add_vegetation",
+            "params": {
+                "density": params["vegetation_density"],
+                "types": ["trees", "shrubs", "ground_cover"]
+            }
+        })
+        
+        # Add water features if requested
+        if params["water_features"]:
+            operations.append({
+                "operation": "add_water_features",
+                "params": {
+                    "type": "pond",
+                    "area_ratio": 0.15
+                }
+            })
+        
+        # Add site furniture
+        operations.append({
+            "operation": "add_site_furniture",
+            "params": {
+                "density": 0.5
+            }
+        })
+        
+        return operations
+    
+    def _generate_structure_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate operations specific to structural design."""
+        operations = []
+        
+        # Create structural grid
+        operations.append({
+            "operation": "create_structural_grid",
+            "params": {
+                "grid_size": params["structural_grid"],
+                "system_type": params["structural_system"]
+            }
+        })
+        
+        # Generate columns
+        operations.append({
+            "operation": "generate_columns",
+            "params": {
+                "dimensions": params["column_dimensions"],
+                "material": params["structural_material"]
+            }
+        })
+        
+        # Generate beams
+        operations.append({
+            "operation": "generate_beams",
+            "params": {
+                "depth": params["beam_depth"],
+                "material": params["structural_material"]
+            }
+        })
+        
+        # Generate floor slabs
+        operations.append({
+            "operation": "generate_floor_slabs",
+            "params": {
+                "thickness": 0.2,
+                "material": params["structural_material"]
+            }
+        })
+        
+        # Create lateral system
+        operations.append({
+            "operation": "create_lateral_system",
+            "params": {
+                "type": "bracing",
+                "material": params["structural_material"]
+            }
+        })
+        
+        return operations
+    
+    def _generate_parametric_form_operations(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate operations specific to parametric form generation."""
+        operations = []
+        
+        # Create base geometry
+        operations.append({
+            "operation": "create_base_geometry",
+            "params": {
+                "type": "box",
+                "dimensions": [10, 10, 10]
+            }
+        })
+        
+        # Apply subdivision
+        operations.append({
+            "operation": "apply_subdivision",
+            "params": {
+                "level": params["subdivision_level"],
+                "method": "catmull-clark"
+            }
+        })
+        
+        # Create attractor points
+        operations.append({
+            "operation": "create_attractors",
+            "params": {
+                "count": params["attractor_points"],
+                "influence": 0.7
+            }
+        })
         
-        # Extract parameters from operations
-        params = {}
-        for op in operations:
-            params.update(op.get("params", {}))
+        # Apply deformation
+        operations.append({
+            "operation": "apply_deformation",
+            "params": {
+                "iterations": params["iterations"],
+                "strength": params["complexity"]
+            }
+        })
         
-        # Create urban grid
-        code += """
-# Create urban design grid
-grid_size = {0}  # Size of city blocks in meters
-grid_rows = {1}
-grid_columns = {2}
-road_width = {3}
-site_boundary = {4}  # Size of overall site boundary
-
-# Create site boundary
-site_rect = rs.AddRectangle(rs.WorldXYPlane(), site_boundary, site_boundary)
-site_srf = rs.AddPlanarSrf(site_rect)
-add_object_metadata(site_srf, "SiteBoundary", "Overall urban design site")
-
-# Add main roads
-urban_blocks = []
-for row in range(grid_rows):
-    for col in range(grid_columns):
-        # Calculate block position
-        x = col * (grid_size + road_width)
-        y = row * (grid_size + road_width)
+        # Apply symmetry if requested
+        if params["symmetry"] != "none":
+            operations.append({
+                "operation": "apply_symmetry",
+                "params": {
+                    "type": params["symmetry"],
+                    "preserve_original": True
+                }
+            })
         
-        # Create block footprint
-        block_rect = rs.AddRectangle(
-            rs.MovePlane(rs.WorldXYPlane(), [x, y, 0]), 
-            grid_size, grid_size
-        )
-        block_srf = rs.AddPlanarSrf(block_rect)
-        add_object_metadata(block_srf, "Block_{0}_{1}".format(row, col), "Urban block footprint")
+        return operations
+    
+    def _generate_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
+        """Generate Rhino Python code from operations list, reusing cached output."""
+        if not operations:
+            return "# No operations to generate code from"
         
-        urban_blocks.append({{"id": block_srf, "row": row, "col": col, "x": x, "y": y}})
-""".format(
-            params.get("grid_size", 100.0),
-            params.get("grid_rows", 5),
-            params.get("grid_columns", 5),
-            params.get("road_width", 20.0),
-            params.get("site_boundary", 600.0)
-        )
+        # Code generation is a pure function of the operations, so key on a stable digest
+        key = hashlib.blake2b(
+            json.dumps(operations, sort_keys=True, default=str).encode("utf-8"),
+            digest_size=16
+        ).digest()
         
-        # Generate buildings on blocks
-        code += """
-# Generate buildings on blocks
-max_height = {0}  # Maximum building height
-min_height = {1}  # Minimum building height
-density = {2}  # Building density (0-1)
-building_setback = {3}  # Building setback from block edge
-
-# Create a layer for buildings
-buildings_layer = "Buildings"
-if not rs.IsLayer(buildings_layer):
-    rs.AddLayer(buildings_layer)
-rs.CurrentLayer(buildings_layer)
-
-for block in urban_blocks:
-    # Determine if this block gets a building based on density
-    if random.random() < density:
-        # Calculate building footprint with setback
-        x, y = block["x"], block["y"]
-        footprint_rect = rs.AddRectangle(
-            rs.MovePlane(rs.WorldXYPlane(), [x + building_setback, y + building_setback, 0]), 
-            grid_size - 2 * building_setback, 
-            grid_size - 2 * building_setback
-        )
-        footprint_srf = rs.AddPlanarSrf(footprint_rect)
-        
-        # Determine building height based on rules
-        # Central blocks are taller than edge blocks
-        center_row = grid_rows / 2
-        center_col = grid_columns / 2
-        
-        # Calculate distance from center (0-1 normalized)
-        dist_from_center = math.sqrt((block["row"] - center_row)**2 + (block["col"] - center_col)**2)
-        max_dist = math.sqrt(center_row**2 + center_col**2)
-        norm_dist = dist_from_center / max_dist if max_dist > 0 else 0
-        
-        # Height decreases with distance from center
-        height_factor = 1 - (norm_dist * {4})  # Height distribution factor
-        height = min_height + (max_height - min_height) * height_factor
-        
-        # Apply some randomness to heights
-        height = height * (0.8 + 0.4 * random.random())
-        
-        # Extrude to create building volume
-        building = rs.ExtrudeSurface(footprint_srf, rs.VectorScale(rs.WorldZVector(), height))
-        add_object_metadata(
-            building, 
-            "Building_{0}_{1}".format(block["row"], block["col"]), 
-            "Urban building, height: {0}m".format(round(height, 1))
-        )
+        code = self._rhino_code_cache.get(key)
+        if code is not None:
+            self._rhino_code_cache.move_to_end(key)
+            return code
         
-        # Delete the temporary footprint surface
-        rs.DeleteObject(footprint_srf)
+        code = self._build_rhino_code(operations)
+        self._rhino_code_cache[key] = code
+        if len(self._rhino_code_cache) > _RHINO_CODE_CACHE_SIZE:
+            self._rhino_code_cache.popitem(last=False)
         
-        # Color buildings based on height
-        color_factor = (height - min_height) / (max_height - min_height) if max_height > min_height else 0.5
-        building_color = [int(120 + 135 * color_factor), int(120 + 80 * (1-color_factor)), int(140 + 40 * color_factor)]
-        rs.ObjectColor(building, building_color)
-""".format(
-            params.get("max_building_height", 100.0),
-            params.get("min_building_height", 10.0),
-            params.get("building_density", 0.7),
-            params.get("building_setback", 5.0),
-            params.get("height_distribution", 0.8)
-        )
+        return code
+    
+    def _build_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
+        """Generate Rhino Python code from operations list."""
+        # Extract design domain from the first operation
+        design_domain = operations[0]["params"].get("design_domain", "facade")
         
-        # Add landscape and green areas
-        if params.get("include_green_areas", True):
-            code += """
-# Add parks and green spaces
-green_layer = "GreenSpaces"
-if not rs.IsLayer(green_layer):
-    rs.AddLayer(green_layer, [0, 180, 0])
-rs.CurrentLayer(green_layer)
-
-# Create a central park
-central_row = int(grid_rows / 2)
-central_col = int(grid_columns / 2)
+        # Stream header, domain body and footer into one buffer
+        buf = io.StringIO()
+        buf.write(_RHINO_HEADER_PRE)
+        buf.write(design_domain.replace(" ", "_"))
+        buf.write(_RHINO_HEADER_POST)
 
-# Find blocks to convert to parks
-for block in urban_blocks:
-    # Central park
-    if block["row"] == central_row and block["col"] == central_col:
-        # Delete any building on this block
-        building_obj = rs.ObjectsByName("Building_{0}_{1}".format(block["row"], block["col"]))
-        if building_obj:
-            rs.DeleteObjects(building_obj)
-            
-        # Create park surface
-        park_surface = rs.CopyObject(block["id"])
-        rs.ObjectColor(park_surface, [0, 180, 0])
+        # Select the appropriate domain-specific code generator (default to facade if unknown domain)
+        generate = self._rhino_code_dispatch.get(design_domain, self._generate_facade_rhino_code)
         
-        # Add some trees to the park
-        tree_count = 20
-        park_bounds = rs.BoundingBox(park_surface)
-        min_pt, max_pt = park_bounds[0], park_bounds[6]
-        
-        for i in range(tree_count):
-            # Random position within park
-            tree_x = min_pt[0] + random.random() * (max_pt[0] - min_pt[0])
-            tree_y = min_pt[1] + random.random() * (max_pt[1] - min_pt[1])
-            
-            # Create a tree (simplified as a cylinder and sphere)
-            tree_trunk = rs.AddCylinder(
-                [tree_x, tree_y, 0],
-                [tree_x, tree_y, 3 + random.random() * 2],
-                0.2 + random.random() * 0.3
-            )
-            tree_canopy = rs.AddSphere([tree_x, tree_y, 5 + random.random() * 3], 1.5 + random.random() * 2)
-            
-            # Color the tree parts
-            rs.ObjectColor(tree_trunk, [120, 80, 40])
-            rs.ObjectColor(tree_canopy, [0, 150 + random.randint(0, 50), 0])
-            
-            # Add metadata
-            add_object_metadata(tree_trunk, "Tree_Trunk_{0}".format(i), "Tree trunk in central park")
-            add_object_metadata(tree_canopy, "Tree_Canopy_{0}".format(i), "Tree canopy in central park")
-"""
+        # Run the domain body with redraw suspended so the viewport regenerates once;
+        # the domain templates are already indented into the try block
+        buf.write(_RHINO_REDRAW_OFF)
+        generate(operations, buf)
+        buf.write(_RHINO_REDRAW_ON)
         
-        # Add infrastructure
-        code += """
-# Add main roads network
-roads_layer = "Roads"
-if not rs.IsLayer(roads_layer):
-    rs.AddLayer(roads_layer, [50, 50, 50])
-rs.CurrentLayer(roads_layer)
-
-road_width = {0}
-grid_size_with_road = grid_size + road_width
-
-# Create horizontal roads
-for row in range(grid_rows + 1):
-    road_y = row * grid_size_with_road - road_width/2
-    start_point = [0, road_y, 0.1]  # Slightly above ground
-    end_point = [grid_columns * grid_size_with_road, road_y, 0.1]
-    road = rs.AddRectangle(
-        rs.PlaneFromPoints(
-            start_point,
-            [start_point[0] + 1, start_point[1], start_point[2]],
-            [start_point[0], start_point[1] + road_width, start_point[2]]
-        ),
-        grid_columns * grid_size_with_road,
-        road_width
-    )
-    road_srf = rs.AddPlanarSrf(road)
-    rs.ObjectColor(road_srf, [50, 50, 50])
-    add_object_metadata(road_srf, "Road_H_{0}".format(row), "Horizontal road")
-
-# Create vertical roads
-for col in range(grid_columns + 1):
-    road_x = col * grid_size_with_road - road_width/2
-    start_point = [road_x, 0, 0.1]  # Slightly above ground
-    end_point = [road_x, grid_rows * grid_size_with_road, 0.1]
-    road = rs.AddRectangle(
-        rs.PlaneFromPoints(
-            start_point,
-            [start_point[0] + road_width, start_point[1], start_point[2]],
-            [start_point[0], start_point[1] + 1, start_point[2]]
-        ),
-        road_width,
-        grid_rows * grid_size_with_road
-    )
-    road_srf = rs.AddPlanarSrf(road)
-    rs.ObjectColor(road_srf, [50, 50, 50])
-    add_object_metadata(road_srf, "Road_V_{0}".format(col), "Vertical road")
-""".format(params.get("road_width", 20.0))
+        # Common ending code
+        buf.write(_RHINO_FOOTER)
         
-        return code
-    
-    def _generate_landscape_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
-        """Generate Rhino code for landscape design operations."""
-        # Placeholder for demo
-        code = """
-# Placeholder for landscape generation code
-print("Landscape generation would happen here")
-"""
-        return code
-    
-    def _generate_structure_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
-        """Generate Rhino code for structural design operations."""
-        code = ""
-        
-        # Extract parameters from operations
-        params = {}
-        for op in operations:
-            params.update(op.get("params", {}))
-        
-        # Default values if not provided
-        grid_size = params.get("grid_size", 6.0)
-        system_type = params.get("system_type", "column_beam")
-        column_dimensions = params.get("dimensions", [0.4, 0.4])
-        beam_depth = params.get("beam_depth", 0.5)
-        material = params.get("material", "concrete")
-        num_floors = params.get("num_floors", 3)
-        grid_x = params.get("grid_x", 5)
-        grid_y = params.get("grid_y", 4)
-        floor_height = params.get("floor_height", 3.5)
-        slab_thickness = params.get("thickness", 0.2)
-        
-        # Create material layer
-        code += """
-# Create a layer for structural elements
-struct_layer = "Structural"
-if not rs.IsLayer(struct_layer):
-    rs.AddLayer(struct_layer)
-
-# Create sub-layers for different elements
-columns_layer = "Structural::Columns"
-if not rs.IsLayer(columns_layer):
-    rs.AddLayer(columns_layer)
+        return buf.getvalue()
     
-beams_layer = "Structural::Beams"
-if not rs.IsLayer(beams_layer):
-    rs.AddLayer(beams_layer)
-    
-slabs_layer = "Structural::Slabs"
-if not rs.IsLayer(slabs_layer):
-    rs.AddLayer(slabs_layer)
-    
-bracing_layer = "Structural::Bracing"
-if not rs.IsLayer(bracing_layer):
-    rs.AddLayer(bracing_layer)
-
-# Material colors
-if "{0}" == "concrete":
-    material_color = [200, 200, 200]
-elif "{0}" == "steel":
-    material_color = [100, 100, 120]
-elif "{0}" == "timber":
-    material_color = [180, 150, 100]
-else:
-    material_color = [180, 180, 180]
-""".format(material)
-
-        # Create structural grid
-        code += """
-# Create structural grid
-grid_size = {0}  # Grid spacing in meters
-grid_x = {1}     # Number of grid lines in X direction
-grid_y = {2}     # Number of grid lines in Y direction
-num_floors = {3} # Number of floors
-floor_height = {4} # Height per floor
+    def _generate_facade_rhino_code(self, operations: List[Dict[str, Any]], buf: io.StringIO) -> None:
+        """Generate Rhino code for facade design operations."""
+        # Extract parameters from operations, falling back to the facade defaults
+        params = _merged_params(operations, _FACADE_DEFAULTS).new_child({"width": _FACADE_WIDTH})
+        
+        # Create building envelope
+        buf.write(_FACADE_ENVELOPE_TMPL.format_map(params))
 
-# Create grid points
-grid_points = []
-for i in range(grid_x):
-    for j in range(grid_y):
-        grid_points.append([i * grid_size, j * grid_size, 0])
+        # Only emit the vectorized paths when the facade is large enough to pay for them
+        nx = int(_FACADE_WIDTH / params["grid_size"])
+        nz = int(params["story_count"] * params["floor_height"] / params["grid_size"])
+        vectorize = nx * nz * params["panel_density"] >= _VECTORIZE_THRESHOLD
 
-# Create grid lines to visualize the grid (optional)
-grid_lines_layer = "Structural::GridLines"
-if not rs.IsLayer(grid_lines_layer):
-    rs.AddLayer(grid_lines_layer, [150, 150, 150])
-rs.CurrentLayer(grid_lines_layer)
+        # Create facade system
+        buf.write(_FACADE_GRID_TMPL.format_map(params))
+        buf.write(_FACADE_POSITIONS_NUMPY_TMPL if vectorize else _FACADE_POSITIONS_PLAIN_TMPL)
+        buf.write(_FACADE_PANELS_TMPL.format_map(params))
 
-# Horizontal grid lines (X direction)
-for j in range(grid_y):
-    start_point = [0, j * grid_size, 0]
-    end_point = [(grid_x - 1) * grid_size, j * grid_size, 0]
-    grid_line = rs.AddLine(start_point, end_point)
-    rs.ObjectColor(grid_line, [150, 150, 150])
-    add_object_metadata(grid_line, "GridLine_X_{0}".format(j), "Structural grid line in X direction")
+        # Add sun analysis if responsive
+        if params["responsive_panels"]:
+            buf.write(_FACADE_SUN_TMPL.format_map(params))
+            buf.write(_FACADE_VIEW_TMPL.format_map(params))
 
-# Vertical grid lines (Y direction)
-for i in range(grid_x):
-    start_point = [i * grid_size, 0, 0]
-    end_point = [i * grid_size, (grid_y - 1) * grid_size, 0]
-    grid_line = rs.AddLine(start_point, end_point)
-    rs.ObjectColor(grid_line, [150, 150, 150])
-    add_object_metadata(grid_line, "GridLine_Y_{0}".format(i), "Structural grid line in Y direction")
-""".format(grid_size, grid_x, grid_y, num_floors, floor_height)
+            # Panel rotations
+            buf.write(_FACADE_ROTATION_TMPL.format_map(params))
+            buf.write(_FACADE_ANGLES_NUMBA_TMPL if vectorize else _FACADE_ANGLES_PLAIN_TMPL)
+            buf.write(_FACADE_ROTATION_APPLY_TMPL.format_map(params))
 
-        # Create columns
-        code += """
-# Create columns
-rs.CurrentLayer(columns_layer)
-column_width = {0}
-column_depth = {1}
-columns = []
+        # Material application (unknown materials get the neutral "solid" color)
+        params["material_color"] = _FACADE_MATERIAL_COLORS.get(params["material"], _FACADE_MATERIAL_COLORS["solid"])
+        buf.write(_FACADE_MATERIAL_TMPL.format_map(params))
+    
+    def _generate_floor_plan_rhino_code(self, operations: List[Dict[str, Any]], buf: io.StringIO) -> None:
+        """Generate Rhino code for floor plan operations."""
+        # Extract parameters from operations, falling back to the floor plan defaults
+        params = _merged_params(operations, _FLOOR_PLAN_DEFAULTS)
+        room_count = params["room_count"]
+        open_plan = params["open_plan"]
+        unit_type = params["unit_type"]
+        
+        # Create floor plan outline (the wall thickness comes from the shared apartment layout)
+        buf.write(_FLOOR_PLAN_SETUP_TMPL.format_map(params.new_child(_APARTMENT_LAYOUT)))
 
-for pt in grid_points:
-    for floor in range(num_floors + 1):  # +1 for ground floor
-        # Column base point at this floor
-        base_pt = [pt[0], pt[1], floor * floor_height]
-        
-        # Create column
-        if "{2}" == "concrete" or "{2}" == "timber":
-            # Rectangular column for concrete/timber
-            column = rs.AddBox(
-                rs.MovePlane(rs.WorldXYPlane(), base_pt),
-                column_width, column_depth, floor_height
-            )
-        else:
-            # I-beam or H-column for steel
-            # Simplified as rectangular for now
-            column = rs.AddBox(
-                rs.MovePlane(rs.WorldXYPlane(), base_pt),
-                column_width, column_depth, floor_height
+        # Generate different layouts based on unit_type
+        if unit_type == "studio" or (room_count == 1 and open_plan):
+            buf.write(_FLOOR_PLAN_STUDIO_TMPL)
+        elif unit_type == "apartment" or not open_plan:
+            buf.write(_FLOOR_PLAN_APARTMENT_TMPL.format_map(_APARTMENT_LAYOUT))
+            
+            # Door positions follow from the room layout, so resolve them now
+            door_centers = _apartment_door_centers(
+                params["width"], params["depth"], room_count, params["has_kitchen"], params["has_bathroom"]
             )
+            buf.write(_FLOOR_PLAN_DOORS_TMPL.format(door_centers=door_centers))
         
-        rs.ObjectColor(column, material_color)
-        add_object_metadata(
-            column, 
-            "Column_X{0}_Y{1}_F{2}".format(int(pt[0]/grid_size), int(pt[1]/grid_size), floor),
-            "Structural column at grid ({0}, {1}), floor {2}"
-        )
-        columns.append({{"id": column, "x": pt[0], "y": pt[1], "floor": floor}})
-""".format(column_dimensions[0], column_dimensions[1], material)
-
-        # Create beams
-        code += """
-# Create beams
-rs.CurrentLayer(beams_layer)
-beam_depth = {0}
-beam_width = {1}
-
-# Function to create a beam between two points
-def create_beam(start_pt, end_pt, floor, beam_index):
-    # Create a line representing the beam centerline
-    beam_line = rs.AddLine(start_pt, end_pt)
-    
-    # Create a plane aligned with the beam
-    beam_dir = rs.VectorCreate(end_pt, start_pt)
-    beam_dir = rs.VectorUnitize(beam_dir)
-    beam_plane = rs.PlaneFromNormal(start_pt, [0, 0, 1], beam_dir)
-    
-    # Create rectangular profile
-    beam_rect = rs.AddRectangle(
-        beam_plane,
-        beam_width,
-        beam_depth
-    )
-    
-    # Move the rectangle to center it on the line
-    rs.MoveObject(beam_rect, [0, 0, -beam_depth/2])
-    
-    # Create beam by extruding along the path
-    beam_crv = rs.AddLine(start_pt, end_pt)
-    beam = rs.ExtrudeCurve(beam_rect, beam_crv)
-    
-    # Clean up temp objects
-    rs.DeleteObjects([beam_rect, beam_crv, beam_line])
-    
-    rs.ObjectColor(beam, material_color)
-    add_object_metadata(
-        beam, 
-        "Beam_{0}_Floor{1}".format(beam_index, floor),
-        "Structural beam at floor {0}".format(floor)
-    )
-    return beam
-
-# Create beams in X direction
-beam_index = 0
-for j in range(grid_y):
-    for i in range(grid_x - 1):
-        for floor in range(1, num_floors + 1):  # Start from 1st floor (above ground)
-            start_pt = [i * grid_size, j * grid_size, floor * floor_height]
-            end_pt = [(i + 1) * grid_size, j * grid_size, floor * floor_height]
-            beam = create_beam(start_pt, end_pt, floor, beam_index)
-            beam_index += 1
-
-# Create beams in Y direction
-for i in range(grid_x):
-    for j in range(grid_y - 1):
-        for floor in range(1, num_floors + 1):  # Start from 1st floor
-            start_pt = [i * grid_size, j * grid_size, floor * floor_height]
-            end_pt = [i * grid_size, (j + 1) * grid_size, floor * floor_height]
-            beam = create_beam(start_pt, end_pt, floor, beam_index)
-            beam_index += 1
-""".format(beam_depth, column_dimensions[0] * 0.8)
-
-        # Create floor slabs
-        code += """
-# Create floor slabs
-rs.CurrentLayer(slabs_layer)
-slab_thickness = {0}
-
-for floor in range(1, num_floors + 1):  # Start from 1st floor
-    # Create the corners of the floor slab
-    slab_corners = [
-        [0, 0, floor * floor_height - slab_thickness/2],
-        [(grid_x - 1) * grid_size, 0, floor * floor_height - slab_thickness/2],
-        [(grid_x - 1) * grid_size, (grid_y - 1) * grid_size, floor * floor_height - slab_thickness/2],
-        [0, (grid_y - 1) * grid_size, floor * floor_height - slab_thickness/2]
-    ]
-    
-    # Create slab as a box
-    slab_width = (grid_x - 1) * grid_size
-    slab_length = (grid_y - 1) * grid_size
-    slab = rs.AddBox(
-        rs.MovePlane(
-            rs.WorldXYPlane(), 
-            [0, 0, floor * floor_height - slab_thickness]
-        ),
-        slab_width, slab_length, slab_thickness
-    )
-    
-    # Color slightly different from structural elements
-    slab_color = [min(material_color[0] + 20, 255), 
-                 min(material_color[1] + 20, 255), 
-                 min(material_color[2] + 20, 255)]
-    rs.ObjectColor(slab, slab_color)
-    
-    add_object_metadata(
-        slab,
-        "FloorSlab_{0}".format(floor),
-        "Floor slab at level {0}".format(floor)
-    )
-""".format(slab_thickness)
+        # Add balcony if requested
+        if params["has_balcony"]:
+            buf.write(_FLOOR_PLAN_BALCONY_TMPL)
 
-        # Create lateral bracing if specified
-        code += """
-# Create lateral system (bracing)
-rs.CurrentLayer(bracing_layer)
+        # Extrude walls, furnish the rooms and commit the plan geometry
+        buf.write(_FLOOR_PLAN_FURNISH_TMPL)
 
-if "{0}" == "bracing":
-    # Add diagonal bracing on perimeter
-    bracing_width = 0.15  # Width of bracing elements
-    
-    # Function to create a diagonal brace
-    def create_brace(start_pt, end_pt, brace_index):
-        # Create brace centerline
-        brace_line = rs.AddLine(start_pt, end_pt)
+    def _generate_urban_rhino_code(self, operations: List[Dict[str, Any]], buf: io.StringIO) -> None:
+        """Generate Rhino code for urban design operations."""
+        # Extract parameters from operations, falling back to the urban defaults
+        params = _merged_params(operations, _URBAN_DEFAULTS)
         
-        # Create a circular profile
-        profile = rs.AddCircle(rs.MovePlane(rs.WorldXYPlane(), start_pt), bracing_width/2)
+        # Create urban grid
+        buf.write(_URBAN_GRID_TMPL.format_map(params))
         
-        # Extrude along path
-        brace = rs.ExtrudeCurve(profile, brace_line)
+        # Only emit the NumPy draws and Numba height kernel when the grid is large enough to pay for them
+        vectorize = params["grid_rows"] * params["grid_columns"] >= _VECTORIZE_THRESHOLD
+
+        # Generate buildings on blocks
+        buf.write(_URBAN_BUILDINGS_TMPL.format_map(params))
+        buf.write(_URBAN_DRAWS_NUMPY_TMPL if vectorize else _URBAN_DRAWS_PLAIN_TMPL)
+        buf.write(_URBAN_BLOCK_HEIGHTS_TMPL)
+        buf.write(_URBAN_HEIGHTS_NUMBA_TMPL if vectorize else _URBAN_HEIGHTS_PLAIN_TMPL)
+        buf.write(_URBAN_BUILDING_PLACEMENT_TMPL)
         
-        # Clean up
-        rs.DeleteObjects([profile, brace_line])
+        # Add landscape and green areas
+        if params["include_green_areas"]:
+            buf.write(_URBAN_GREEN_TMPL)
         
-        # Style the brace
-        if "{1}" == "steel":
-            brace_color = [80, 80, 100]  # Darker for steel
-        else:
-            brace_color = [min(material_color[0] - 30, 255), 
-                         min(material_color[1] - 30, 255), 
-                         min(material_color[2] - 30, 255)]
-            
-        rs.ObjectColor(brace, brace_color)
-        add_object_metadata(
-            brace,
-            "Brace_{0}".format(brace_index),
-            "Lateral bracing element"
-        )
-        return brace
-    
-    # Add X-bracing on end bays
-    brace_index = 0
+        # Add infrastructure
+        buf.write(_URBAN_ROADS_TMPL.format_map(params))
     
-    # Front facade X-bracing
-    for i in range(grid_x - 1):
-        for floor in range(num_floors):
-            # Lower-left to upper-right diagonal
-            start_pt = [i * grid_size, 0, floor * floor_height]
-            end_pt = [(i + 1) * grid_size, 0, (floor + 1) * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
-            
-            # Upper-left to lower-right diagonal
-            start_pt = [i * grid_size, 0, (floor + 1) * floor_height]
-            end_pt = [(i + 1) * grid_size, 0, floor * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
+    def _generate_landscape_rhino_code(self, operations: List[Dict[str, Any]], buf: io.StringIO) -> None:
+        """Generate Rhino code for landscape design operations."""
+        # Placeholder for demo
+        buf.write(_LANDSCAPE_PLACEHOLDER_TMPL)
     
-    # Back facade X-bracing
-    for i in range(grid_x - 1):
-        for floor in range(num_floors):
-            # Lower-left to upper-right diagonal
-            start_pt = [i * grid_size, (grid_y - 1) * grid_size, floor * floor_height]
-            end_pt = [(i + 1) * grid_size, (grid_y - 1) * grid_size, (floor + 1) * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
-            
-            # Upper-left to lower-right diagonal
-            start_pt = [i * grid_size, (grid_y - 1) * grid_size, (floor + 1) * floor_height]
-            end_pt = [(i + 1) * grid_size, (grid_y - 1) * grid_size, floor * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
-            
-    # Left side X-bracing
-    for j in range(grid_y - 1):
-        for floor in range(num_floors):
-            # Lower-left to upper-right diagonal
-            start_pt = [0, j * grid_size, floor * floor_height]
-            end_pt = [0, (j + 1) * grid_size, (floor + 1) * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
-            
-            # Upper-left to lower-right diagonal
-            start_pt = [0, j * grid_size, (floor + 1) * floor_height]
-            end_pt = [0, (j + 1) * grid_size, floor * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
-            
-    # Right side X-bracing
-    for j in range(grid_y - 1):
-        for floor in range(num_floors):
-            # Lower-left to upper-right diagonal
-            start_pt = [(grid_x - 1) * grid_size, j * grid_size, floor * floor_height]
-            end_pt = [(grid_x - 1) * grid_size, (j + 1) * grid_size, (floor + 1) * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
-            
-            # Upper-left to lower-right diagonal
-            start_pt = [(grid_x - 1) * grid_size, j * grid_size, (floor + 1) * floor_height]
-            end_pt = [(grid_x - 1) * grid_size, (j + 1) * grid_size, floor * floor_height]
-            brace = create_brace(start_pt, end_pt, brace_index)
-            brace_index += 1
-""".format(system_type, material)
+    def _generate_structure_rhino_code(self, operations: List[Dict[str, Any]], buf: io.StringIO) -> None:
+        """Generate Rhino code for structural design operations."""
+        # Extract parameters from operations, falling back to the structure defaults
+        params = _merged_params(operations, _STRUCTURE_DEFAULTS).new_child()
+        column_width, column_depth = params["dimensions"][:2]
+        params["column_width"] = column_width
+        params["column_depth"] = column_depth
+        params["beam_width"] = column_width * 0.8
+        
+        # Material color (unknown materials get a neutral gray)
+        material = params["material"]
+        material_rgb = _STRUCTURE_MATERIAL_COLORS.get(material, [180, 180, 180])
+        params["material_rgb"] = material_rgb
+        
+        # Only emit the vectorized paths when the grid is large enough to pay for them
+        vectorize = params["grid_x"] * params["grid_y"] * params["num_floors"] >= _VECTORIZE_THRESHOLD
+
+        # Layers and material colors, structural grid, columns, beams and floor slabs
+        buf.write(_STRUCTURE_LAYERS_TMPL.format_map(params))
+        buf.write(_STRUCTURE_GRID_TMPL.format_map(params))
+        buf.write(_STRUCTURE_GRID_POINTS_NUMPY_TMPL if vectorize else _STRUCTURE_GRID_POINTS_PLAIN_TMPL)
+        buf.write(_STRUCTURE_GRID_LINES_TMPL.format_map(params))
+        buf.write(_STRUCTURE_COLUMNS_TMPL.format_map(params))
+        buf.write(_STRUCTURE_BEAMS_TMPL.format_map(params))
+        buf.write(_STRUCTURE_BEAM_ENDS_NUMPY_TMPL if vectorize else _STRUCTURE_BEAM_ENDS_PLAIN_TMPL)
+        buf.write(_STRUCTURE_BEAMS_ADD_TMPL)
+        buf.write(_STRUCTURE_SLABS_TMPL.format_map(params))
 
-        return code
+        # Create lateral bracing if specified
+        buf.write(_STRUCTURE_BRACING_LAYER)
+        if params["system_type"] == "bracing":
+            # Brace positions follow from the grid, so resolve them now
+            brace_endpoints = _brace_endpoints(
+                params["grid_x"], params["grid_y"], params["num_floors"], params["grid_size"], params["floor_height"]
+            )
+            # Braces are darker than the structural members (fixed dark gray for steel)
+            params["brace_rgb"] = [80, 80, 100] if material == "steel" else [c - 30 for c in material_rgb]
+            buf.write(_STRUCTURE_BRACES_PRE.format_map(params))
+            # One (x0, y0, z0, x1, y1, z1) row per brace, joined in a single pass
+            buf.write("".join(f"\n        {row!r}," for row in brace_endpoints))
+            buf.write(_STRUCTURE_BRACES_POST)
     
-    def _generate_parametric_form_rhino_code(self, operations: List[Dict[str, Any]]) -> str:
+    def _generate_parametric_form_rhino_code(self, operations: List[Dict[str, Any]], buf: io.StringIO) -> None:
         """Generate Rhino code for parametric form generation operations."""
         # Placeholder for demo
-        code = """
-# Placeholder for parametric form generation code
-print("Parametric form generation would happen here")
-"""
-        return code
+        buf.write(_PARAMETRIC_FORM_PLACEHOLDER_TMPL)
     
     def _generate_grasshopper_code(self, operations: List[Dict[str, Any]]) -> str:
         """Generate Grasshopper Python component code from operations."""
-        # Get the design domain from the first operation
-        design_domain = operations[0]["params"]["design_domain"]
-        
-        # Extracting common parameters
-        params = {}
-        for op in operations:
-            params.update(op.get("params", {}))
+        if not operations:
+            return "# No operations to generate code from"
         
-        # Start with common GH code based on the design domain
-        gh_code = """
-import Rhino.Geometry as rg
-import scriptcontext as sc
-import Grasshopper.Kernel.Data.GH_Path as GH_Path
-import Grasshopper.DataTree as DataTree
-import System
-import math
-import random
-
-# This is a parametric {0} design generator
-# Input parameters (can be connected to Grasshopper sliders/components)
-""".format(design_domain)
-
-        # Rest of GH code would be similar to Rhino code but adapted for Grasshopper
-        # Placeholder for demo
-        gh_code += """
-# Placeholder for Grasshopper code generation
-# Would be specific to the {0} design domain
-
-# Set outputs
-output = "{0} design generation would happen in Grasshopper"
-""".format(design_domain)
+        # Get the design domain from the first operation
+        design_domain = operations[0]["params"].get("design_domain", "facade")
         
-        return gh_code
+        # Common GH header and the domain body, with the domain name spliced in
+        return design_domain.join(_GRASSHOPPER_PARTS)
     
-    def interpret_brief(self, brief: str) -> Dict[str, Any]:
+    def interpret_brief(self, brief: str, targets: Sequence[str] = _DEFAULT_CODE_TARGETS) -> Dict[str, Any]:
         """
         Main method to interpret a design brief and generate a structured response.
         
         Args:
             brief: A natural language design brief
+            targets: Code targets to generate ("rhino", "grasshopper"), or a single target name;
+                unknown targets are reported as an error
             
         Returns:
             A dictionary containing the interpreted brief with operations
         """
+        targets = _normalize_targets(targets)
         try:
-            logger.info("Processing design brief: {0}".format(brief))
+            logger.info("Processing design brief: %s", brief)
             
             # Extract keywords from brief
-            keywords = self._extract_keywords(brief)
-            logger.debug("Extracted keywords: {0}".format(keywords))
+            tokens = self._match_keywords(brief)
+            keywords = self._extract_keywords(tokens)
+            logger.debug("Extracted keywords: %s", keywords)
             
             # Derive parameters from keywords
-            params = self._derive_parameters(keywords)
-            logger.debug("Derived parameters: {0}".format(params))
+            params = self._derive_parameters(tokens)
+            logger.debug("Derived parameters: %s", params)
             
             # Generate operations sequence
             operations = self._generate_operations(params)
-            logger.debug("Generated {0} operations".format(len(operations)))
+            logger.debug("Generated %d operations", len(operations))
             
-            # Generate code
-            rhino_code = self._generate_rhino_code(operations)
-            grasshopper_code = self._generate_grasshopper_code(operations)
+            # Generate code for the requested targets only
+            unknown = [target for target in targets if target not in self._code_dispatch]
+            if unknown:
+                raise ValueError("Unknown code target(s): {0}".format(", ".join(unknown)))
+            code = {target: self._code_dispatch[target](operations) for target in targets}
             
             # Create the response
-            response = {
+            return {
                 "brief": brief,
                 "interpretation": {
                     "keywords": keywords,
                     "parameters": params
                 },
                 "operations": operations,
-                "code": {
-                    "rhino": rhino_code,
-                    "grasshopper": grasshopper_code
-                }
+                "code": code
             }
             
-            return response
-            
         except Exception as e:
-            logger.error("Error interpreting design brief: {0}".format(str(e)))
+            logger.error("Error interpreting design brief: %s", e)
             return {
                 "error": str(e),
                 "brief": brief
             }
+    
+    def interpret_brief_json(self, brief: str, targets: Sequence[str] = _DEFAULT_CODE_TARGETS) -> str:
+        """
+        Interpret a design brief into its serialized JSON response, reusing cached output.
+        
+        The cached strings are immutable, so repeated briefs are served without
+        re-interpreting, copying or re-encoding anything. Error responses are not
+        cached, so a brief that failed is interpreted again on the next call.
+        """
+        key = (brief, _normalize_targets(targets))
+        text = self._brief_cache.get(key)
+        if text is not None:
+            self._brief_cache.move_to_end(key)
+            logger.info("Reusing interpretation of design brief: %s", brief)
+            return text
+        
+        response = self.interpret_brief(brief, targets)
+        text = _dumps_response(response)
+        if "error" not in response:
+            self._brief_cache[key] = text
+            if len(self._brief_cache) > _BRIEF_CACHE_SIZE:
+                self._brief_cache.popitem(last=False)
+        
+        return text
+
+
+# Interpreter of the current batch worker process, created once by the pool initializer
+_batch_interpreter = None
+
+
+def _init_batch_worker() -> None:
+    global _batch_interpreter
+    _batch_interpreter = DesignBriefInterpreter()
+
+
+def _interpret_brief_in_worker(targets: Tuple[str, ...], brief: str) -> Dict[str, Any]:
+    return _batch_interpreter.interpret_brief(brief, targets)
+
+
+# Worker pool for large batches, started on first use and kept for the life of the server
+_batch_pool = None
+
+
+def _get_batch_pool() -> "multiprocessing.pool.Pool":
+    """Get or create the batch worker pool"""
+    global _batch_pool
+    if _batch_pool is None:
+        _batch_pool = multiprocessing.Pool(initializer=_init_batch_worker)
+        atexit.register(_batch_pool.terminate)
+    return _batch_pool
 
 
 def register_design_brief_tool(app):
@@ -1792,16 +2381,37 @@ def register_design_brief_tool(app):
     interpreter = DesignBriefInterpreter()
     
     @app.tool()
-    def interpret_design_brief(ctx, brief: str) -> str:
+    def interpret_design_brief(ctx: Context, brief: str, targets: Optional[List[str]] = None) -> str:
         """
         Interpret a natural language design brief and convert it into
         parametric operations and code for Rhino and Grasshopper.
         
         Args:
             brief: A natural language design brief (e.g., "I need a dynamic façade that responds to sun angle and frames views")
+            targets: Code to generate, any of "rhino" and "grasshopper" (defaults to Rhino code only)
             
         Returns:
             A JSON string containing the interpreted brief, operations sequence, and generated code
         """
-        response = interpreter.interpret_brief(brief)
-        return json.dumps(response, indent=2) 
\ No newline at end of file
+        return interpreter.interpret_brief_json(brief, targets or _DEFAULT_CODE_TARGETS)
+    
+    @app.tool()
+    def interpret_design_briefs_batch(ctx: Context, briefs: List[str], targets: Optional[List[str]] = None) -> str:
+        """
+        Interpret several design briefs at once, spreading large batches over worker processes.
+        
+        Args:
+            briefs: Natural language design briefs, interpreted independently
+            targets: Code to generate, any of "rhino" and "grasshopper" (defaults to Rhino code only)
+            
+        Returns:
+            A JSON array with one interpreted-brief object per brief, in the order given
+        """
+        targets = _normalize_targets(targets or _DEFAULT_CODE_TARGETS)
+        if len(briefs) < _BATCH_POOL_THRESHOLD:
+            results = [interpreter.interpret_brief(brief, targets) for brief in briefs]
+        else:
+            # Each worker builds its own interpreter, so nothing stateful is pickled
+            interpret = partial(_interpret_brief_in_worker, targets)
+            results = _get_batch_pool().map(interpret, briefs, chunksize=_BATCH_CHUNK_SIZE)
+        return _dumps_response(results) 
\ No newline at end of file
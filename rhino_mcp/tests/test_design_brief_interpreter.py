@@ -0,0 +1,334 @@
+"""Tests for the design brief interpreter: optional fast paths against their fallbacks."""
+
+import asyncio
+import json
+import sys
+import textwrap
+from unittest import mock
+
+import pytest
+from mcp.server.fastmcp import FastMCP
+
+from rhino_mcp import design_brief_interpreter as dbi
+
+
+class _ToolApp:
+    """Stand-in for the MCP server that just collects the registered tools."""
+
+    def __init__(self):
+        self.tools = {}
+
+    def tool(self):
+        def register(fn):
+            self.tools[fn.__name__] = fn
+            return fn
+        return register
+
+
+# (grid_x, grid_y, num_floors, grid_size, floor_height), including degenerate frames
+BRACE_GRIDS = [
+    (5, 4, 3, 6.0, 3.5),
+    (6, 3, 4, 7.5, 4.0),
+    (2, 2, 1, 6.0, 3.5),
+    (1, 1, 1, 6.0, 3.5),
+    (1, 1, 0, 6.0, 3.5),
+    (4, 3, 0, 6.0, 3.5),
+    (0, 3, 2, 6.0, 3.0),
+]
+
+
+@pytest.mark.parametrize("grid", BRACE_GRIDS)
+def test_brace_endpoints_count(grid):
+    grid_x, grid_y, num_floors = grid[:3]
+    braces = dbi._brace_endpoints(*grid)
+    assert len(braces) == 4 * (max(grid_x - 1, 0) + max(grid_y - 1, 0)) * num_floors
+    assert all(len(row) == 6 for row in braces)
+
+
+def test_brace_endpoints_single_bay():
+    # One bay on every face of a 2x2 grid, one floor: front, back, left, right
+    assert dbi._brace_endpoints(2, 2, 1, 6.0, 3.5) == [
+        (0.0, 0.0, 0.0, 6.0, 0.0, 3.5), (0.0, 0.0, 3.5, 6.0, 0.0, 0.0),
+        (0.0, 6.0, 0.0, 6.0, 6.0, 3.5), (0.0, 6.0, 3.5, 6.0, 6.0, 0.0),
+        (0.0, 0.0, 0.0, 0.0, 6.0, 3.5), (0.0, 0.0, 3.5, 0.0, 6.0, 0.0),
+        (6.0, 0.0, 0.0, 6.0, 6.0, 3.5), (6.0, 0.0, 3.5, 6.0, 6.0, 0.0),
+    ]
+
+
+def test_interpret_brief_end_to_end():
+    response = dbi.DesignBriefInterpreter().interpret_brief("a dense glass tower")
+    assert "error" not in response
+    assert response["brief"] == "a dense glass tower"
+    assert response["interpretation"]["keywords"] == {"building_type": ["tower"], "materials": ["glass"], "pattern": ["dense"]}
+    assert response["operations"][0]["operation"] == "initialize_design"
+    assert list(response["code"]) == ["rhino"]
+    compile(response["code"]["rhino"], "brief", "exec")
+
+
+def test_interpret_brief_json_caches_serialized_response():
+    interpreter = dbi.DesignBriefInterpreter()
+
+    text = interpreter.interpret_brief_json("a dense glass tower")
+    assert '"error"' not in text
+    assert interpreter.interpret_brief_json("a dense glass tower") is text
+    assert len(interpreter._brief_cache) == 1
+
+
+def test_interpret_brief_json_does_not_cache_errors(monkeypatch):
+    interpreter = dbi.DesignBriefInterpreter()
+
+    def fail(params):
+        raise RuntimeError("operation generation failed")
+
+    monkeypatch.setattr(interpreter, "_generate_operations", fail)
+    assert '"error"' in interpreter.interpret_brief_json("a dense glass tower")
+    assert not interpreter._brief_cache
+
+
+@pytest.mark.parametrize("pool_threshold", [dbi._BATCH_POOL_THRESHOLD, 2])
+def test_batch_tool_returns_one_response_per_brief(monkeypatch, pool_threshold):
+    monkeypatch.setattr(dbi, "_BATCH_POOL_THRESHOLD", pool_threshold)
+    app = _ToolApp()
+    dbi.register_design_brief_tool(app)
+    briefs = ["a dense glass tower", "static wood building", "", "kinetic louvres"]
+
+    try:
+        results = json.loads(app.tools["interpret_design_briefs_batch"](None, briefs))
+    finally:
+        if dbi._batch_pool is not None:
+            dbi._batch_pool.terminate()
+            dbi._batch_pool = None
+
+    assert [result["brief"] for result in results] == briefs
+    for result in results:
+        assert "error" not in result
+        assert result["operations"]
+        assert "rhino" in result["code"]
+
+
+def _tool_schemas():
+    app = FastMCP("design-brief-test")
+    dbi.register_design_brief_tool(app)
+    return {tool.name: tool.inputSchema for tool in asyncio.run(app.list_tools())}
+
+
+def test_brief_tool_schema_hides_the_context():
+    schema = _tool_schemas()["interpret_design_brief"]
+    assert "ctx" not in schema["properties"]
+    assert schema["required"] == ["brief"]
+    assert "targets" in schema["properties"]
+
+
+def test_batch_tool_schema_hides_the_context():
+    schema = _tool_schemas()["interpret_design_briefs_batch"]
+    assert "ctx" not in schema["properties"]
+    assert schema["required"] == ["briefs"]
+
+
+@pytest.mark.parametrize("targets, expected", [
+    ("grasshopper", ("grasshopper",)),
+    (["rhino"], ("rhino",)),
+    (["rhino", "grasshopper", "rhino"], ("grasshopper", "rhino")),
+])
+def test_normalize_targets(targets, expected):
+    assert dbi._normalize_targets(targets) == expected
+
+
+def test_interpret_brief_accepts_a_single_target_string(monkeypatch):
+    interpreter = dbi.DesignBriefInterpreter()
+    operations = [{"operation": "initialize_design", "params": {"design_domain": "landscape"}}]
+    monkeypatch.setattr(interpreter, "_generate_operations", lambda params: operations)
+
+    response = interpreter.interpret_brief("a dense glass tower", "grasshopper")
+    assert "error" not in response
+    assert list(response["code"]) == ["grasshopper"]
+
+
+@pytest.mark.parametrize("domain", ["facade", "floor_plan", "urban", "structure"])
+def test_rhino_code_does_not_write_into_operations(domain):
+    operations = [
+        {"operation": "initialize_design", "params": {"design_domain": domain}},
+        {"operation": "configure", "params": {"design_domain": domain, "system_type": "bracing"}},
+    ]
+    snapshot = json.dumps(operations, sort_keys=True)
+    code = dbi.DesignBriefInterpreter()._build_rhino_code(operations)
+    compile(code, domain, "exec")
+    assert json.dumps(operations, sort_keys=True) == snapshot
+
+
+# The emitted bathroom sits below the master bedroom, so layouts start at two rooms
+@pytest.mark.parametrize("room_count", [2, 3, 4])
+@pytest.mark.parametrize("has_kitchen, has_bathroom", [(True, True), (False, True), (True, False)])
+def test_apartment_doors_lie_on_the_emitted_rooms(room_count, has_kitchen, has_bathroom):
+    width, depth = 15.0, 12.0
+    rooms = {}
+    namespace = {
+        "width": width, "depth": depth, "room_count": room_count,
+        "has_kitchen": has_kitchen, "has_bathroom": has_bathroom,
+        "wall_thickness": dbi._APARTMENT_LAYOUT["wall_thickness"],
+        "room_xs": [], "room_ys": [], "room_widths": [], "room_depths": [], "wall_curves": [],
+        "add_area": lambda *args: None,
+        "add_room": lambda name, x, y, room_width, room_depth: rooms.update({name: (x, y, room_width, room_depth)}),
+        "line_curve": lambda start, end: None,
+    }
+    exec(textwrap.dedent(dbi._FLOOR_PLAN_APARTMENT_TMPL.format_map(dbi._APARTMENT_LAYOUT)), namespace)
+
+    door_centers = dbi._apartment_door_centers(width, depth, room_count, has_kitchen, has_bathroom)
+    assert set(door_centers) == set(rooms)
+    for name, (door_x, door_y, _) in door_centers.items():
+        x, y, room_width, room_depth = rooms[name]
+        assert x - 1e-9 <= door_x <= x + room_width + 1e-9 or y - 1e-9 <= door_y <= y + room_depth + 1e-9
+
+
+BRIEFS = [
+    "I need a dynamic facade that responds to sun angle and frames views, glass and metal, dense pattern",
+    "A high-rise tower with kinetic louvres, framing views, transparent, modular prefab concrete",
+    "static opaque wood building with sparse porous parametric panels and daylight",
+    "Mid-rise SOLAR sunshade; adaptive, responsive aluminum with a vista and panorama outlook",
+    "low-rise lightweight building, climate and weather and temperature, shadowing",
+    "no keywords here at all",
+    "",
+]
+
+
+@pytest.mark.parametrize("brief", BRIEFS)
+def test_keyword_automaton_matches_regex(monkeypatch, brief):
+    pytest.importorskip("ahocorasick")
+    automaton_tokens = dbi.DesignBriefInterpreter()._match_keywords(brief)
+
+    monkeypatch.setattr(dbi, "ahocorasick", None)
+    interpreter = dbi.DesignBriefInterpreter()
+    assert interpreter._automaton is None
+    assert automaton_tokens == interpreter._match_keywords(brief)
+
+
+def _facade_response():
+    interpreter = dbi.DesignBriefInterpreter()
+    operations = [
+        {"operation": "initialize_design", "params": {"design_domain": "facade"}},
+        {"operation": "create_facade_system", "params": {"design_domain": "facade", "grid_size": 1.5}},
+    ]
+    return {
+        "brief": "A dynamic façade that frames views ☀",
+        "interpretation": {
+            "keywords": {"facade_type": ["dynamic"], "views": ["views"]},
+            "parameters": dict(interpreter.DEFAULT_PARAMS),
+        },
+        "operations": operations,
+        "code": {
+            "rhino": interpreter._generate_rhino_code(operations),
+            "grasshopper": interpreter._generate_grasshopper_code(operations),
+        },
+    }
+
+
+@pytest.mark.parametrize("response", [_facade_response(), [_facade_response(), {"error": "'x'", "brief": ""}], []])
+def test_dumps_response_orjson_matches_json(monkeypatch, response):
+    pytest.importorskip("orjson")
+    text = dbi._dumps_response(response)
+
+    monkeypatch.setattr(dbi, "orjson", None)
+    assert text == dbi._dumps_response(response)
+    assert json.loads(text) == response
+
+
+def test_dumps_response_orjson_round_trips_like_json(monkeypatch):
+    pytest.importorskip("orjson")
+    # orjson and json spell some floats differently (0.00001 vs 1e-05), but parse back alike
+    response = {"values": [1e-05, 0.1 + 0.2, 1e20, -0.0], "nested": {"empty": [], "none": None}}
+    text = dbi._dumps_response(response)
+
+    monkeypatch.setattr(dbi, "orjson", None)
+    assert json.loads(text) == json.loads(dbi._dumps_response(response)) == response
+
+
+@pytest.mark.parametrize("grid", BRACE_GRIDS)
+def test_braced_structure_code_compiles(grid):
+    grid_x, grid_y, num_floors, grid_size, floor_height = grid
+    operations = [{"operation": "initialize_design", "params": {
+        "design_domain": "structure", "system_type": "bracing", "grid_x": grid_x, "grid_y": grid_y,
+        "num_floors": num_floors, "grid_size": grid_size, "floor_height": floor_height,
+    }}]
+    code = dbi.DesignBriefInterpreter()._build_rhino_code(operations)
+    compile(code, "structure", "exec")
+
+
+def _rhino_modules():
+    """Mock Rhino modules for running an emitted script; rs.AddBox keeps the real signature."""
+    def add_box(corners):
+        assert len(corners) == 8, "rs.AddBox takes a list of 8 corner points"
+        return mock.MagicMock(name="box")
+
+    rs = mock.MagicMock(name="rhinoscriptsyntax")
+    rs.AddBox = mock.MagicMock(side_effect=add_box)
+    sc = mock.MagicMock(name="scriptcontext")
+    sc.doc.Layers.FindByFullPath.return_value = -1
+    system = mock.MagicMock(name="System")
+    rhino = mock.MagicMock(name="Rhino")
+    return {
+        "rhinoscriptsyntax": rs, "scriptcontext": sc, "System": system, "System.Drawing": system.Drawing,
+        "Rhino": rhino, "Rhino.Geometry": rhino.Geometry, "Rhino.DocObjects": rhino.DocObjects,
+    }
+
+
+@pytest.mark.parametrize("system_type", ["column_beam", "bracing"])
+def test_structure_script_runs_through_every_section(monkeypatch, system_type):
+    grid_x, grid_y, num_floors = 4, 3, 2
+    operations = [{"operation": "initialize_design", "params": {
+        "design_domain": "structure", "system_type": system_type,
+        "grid_x": grid_x, "grid_y": grid_y, "num_floors": num_floors,
+    }}]
+    code = dbi.DesignBriefInterpreter()._build_rhino_code(operations)
+
+    modules = _rhino_modules()
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    exec(compile(code, "structure", "exec"), {"__name__": "structure"})
+
+    rs = modules["rhinoscriptsyntax"]
+    braces = 4 * ((grid_x - 1) + (grid_y - 1)) * num_floors if system_type == "bracing" else 0
+    assert rs.ExtrudeCurve.call_count == braces
+    assert rs.ZoomExtents.called
+
+
+def _run_structure_script(monkeypatch, grid_x, grid_y, num_floors):
+    operations = [{"operation": "initialize_design", "params": {
+        "design_domain": "structure", "grid_x": grid_x, "grid_y": grid_y, "num_floors": num_floors,
+    }}]
+    code = dbi.DesignBriefInterpreter()._build_rhino_code(operations)
+    for name, module in _rhino_modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    namespace = {"__name__": "structure"}
+    exec(compile(code, "structure", "exec"), namespace)
+    return code, namespace
+
+
+def test_structure_script_imports_numpy_only_for_large_grids(monkeypatch):
+    small, _ = _run_structure_script(monkeypatch, 4, 3, 2)
+    large, _ = _run_structure_script(monkeypatch, 10, 10, 8)
+    assert "import numpy" not in small
+    assert "import numpy" in large
+
+
+@pytest.mark.parametrize("grid", [(4, 3, 2), (1, 3, 2), (3, 1, 1)])
+def test_structure_numpy_grid_matches_plain(monkeypatch, grid):
+    monkeypatch.setattr(dbi, "_VECTORIZE_THRESHOLD", 0)
+    _, vectorized = _run_structure_script(monkeypatch, *grid)
+    monkeypatch.setattr(dbi, "_VECTORIZE_THRESHOLD", float("inf"))
+    _, plain = _run_structure_script(monkeypatch, *grid)
+    for name in ("grid_points", "beam_starts", "beam_ends", "beam_floors"):
+        assert vectorized[name] == plain[name], name
+
+
+def test_urban_script_imports_numpy_only_for_large_grids():
+    def urban_code(grid_rows, grid_columns):
+        operations = [{"operation": "initialize_design", "params": {
+            "design_domain": "urban", "grid_rows": grid_rows, "grid_columns": grid_columns,
+        }}]
+        code = dbi.DesignBriefInterpreter()._build_rhino_code(operations)
+        compile(code, "urban", "exec")
+        return code
+
+    small, large = urban_code(5, 5), urban_code(30, 30)
+    assert "import numpy" not in small
+    assert "default_rng" in large and "njit" in large